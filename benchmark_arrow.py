@@ -0,0 +1,80 @@
+'''
+We use this script to compare the memory use and time of `readCsvStandard` with and without `blnArrow`. A large CSV file
+with mixed column types is generated in a temporary directory and each read runs in a fresh Python process, so the peak
+memory of one read does not affect the other. We report the read time, the peak memory of the process while reading and
+the memory held by the returned table, and check that both reads give the same values.
+We run the `make benchArrow` command to call this script. It exits with an error if the values differ or the Arrow
+table uses more memory than the default one.
+'''
+import os, random, subprocess, sys, tempfile
+
+INT_ROWS = 500000
+INT_CHUNK_ROWS = 100000  # rows of the generated file written at a time
+
+# generators of cell text; one per column of the generated file
+LST_GENERATORS = [
+    lambda: str(random.randint(1, 10 ** 6)),
+    lambda: random.choice(["4.0", "5.0", "4.5", ""]),
+    lambda: random.choice(["True", "False", ""]),
+    lambda: random.choice(["Ghana", "Kenya", "Malawi", "Nigeria", "Uganda"]),
+    lambda: "respondent comment " + str(random.randint(0, 1000)),
+    lambda: f"20{random.randint(10, 24)}-0{random.randint(1, 9)}-1{random.randint(0, 9)}",
+]
+
+STR_READER = '''
+import resource, sys, time
+import pandas as pd
+from py_datacuration import readCsvStandard
+intBase = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = time.perf_counter()
+df = readCsvStandard(sys.argv[1], blnArrow=sys.argv[2] == "1")
+print(time.perf_counter() - t)
+print((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - intBase) * 1024)
+print(int(df.memory_usage(deep=True).sum()))
+print(int(pd.util.hash_pandas_object(df.astype(object), index=False).sum()), len(df), list(df.columns))
+'''
+
+
+def writeCsv(strFilePath, intRows):
+    '''
+    Write a CSV file with one column per generator, quoted the way `readCsvStandard` expects.
+    '''
+    with open(strFilePath, "w", encoding="utf-8") as f:
+        f.write(",".join("c" + str(i) for i in range(len(LST_GENERATORS))) + "\n")
+        for intStart in range(0, intRows, INT_CHUNK_ROWS):
+            f.write("".join(",".join('"' + fnCell() + '"' for fnCell in LST_GENERATORS) + "\n" for _ in range(min(INT_CHUNK_ROWS, intRows - intStart))))
+
+
+def readInProcess(strFilePath, blnArrow):
+    '''
+    Read the file in a fresh process and return (seconds, peak bytes of the process while reading, bytes held by the table, values checksum), or None if pyarrow is missing.
+    '''
+    objRun = subprocess.run([sys.executable, "-c", STR_READER, strFilePath, "1" if blnArrow else "0"], capture_output=True, text=True)
+    if objRun.returncode != 0:
+        print(f"blnArrow={blnArrow} skipped ({objRun.stderr.strip().splitlines()[-1]})")
+        return None
+    strTime, strPeak, strTable, strChecksum = objRun.stdout.splitlines()
+    return float(strTime), int(strPeak), int(strTable), strChecksum
+
+
+random.seed(3)
+lstFailures = []
+with tempfile.TemporaryDirectory() as strTmpDir:
+    strFilePath = os.path.join(strTmpDir, "gen.data.csv")
+    writeCsv(strFilePath, INT_ROWS)
+    print(f"{INT_ROWS} rows x {len(LST_GENERATORS)} columns, {os.path.getsize(strFilePath) / 1e6:.1f} MB")
+    dctResults = {strName: readInProcess(strFilePath, blnArrow) for strName, blnArrow in [("default", False), ("blnArrow", True)]}
+for strName, vResult in dctResults.items():
+    if vResult is not None:
+        fltTime, intPeak, intTable, strChecksum = vResult
+        print(f"{strName:10} {fltTime*1000:8.1f} ms  peak {intPeak/1e6:8.1f} MB  table {intTable/1e6:8.1f} MB")
+if None not in dctResults.values():
+    if dctResults["default"][3] != dctResults["blnArrow"][3]:
+        lstFailures.append("blnArrow gives different values than the default path")
+    if dctResults["blnArrow"][2] > dctResults["default"][2]:
+        lstFailures.append("the blnArrow table uses more memory than the default one")
+
+if lstFailures:
+    print("\n".join(lstFailures))
+    sys.exit(1)
+print("Arrow benchmarks complete")
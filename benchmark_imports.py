@@ -0,0 +1,97 @@
+'''
+We use this script to guard the cold-start cost of importing the package. Each module is imported in a fresh Python
+process (best of several runs) and compared against a time budget, and we check that importing the package itself, or
+the light-weight `_file` module, does not pull in heavy dependencies such as pandas.
+We run the `make benchImports` command to call this script. It exits with an error if a budget is exceeded.
+'''
+import subprocess, sys
+
+INT_RUNS = 5
+LST_HEAVY = ["pandas", "numpy", "pydantic", "sqlalchemy", "pymysql", "IPython", "nbconvert", "ipynbname", "humanize"]
+
+# budgets in seconds for a cold import of each module (including its dependencies)
+DCT_BUDGETS = {
+    "py_datacuration": 0.1,
+    "py_datacuration._encoding": 0.1,
+    "py_datacuration._export": 0.1,
+    "py_datacuration._file": 0.1,
+    "py_datacuration._manifest": 0.1,
+    "py_datacuration._pyth": 0.1,
+    "py_datacuration._json": 0.5,
+    "py_datacuration._rowcount": 0.5,
+    "py_datacuration._model": 0.5,
+    "py_datacuration.DatasetModel": 1.0,
+    "py_datacuration._cache": 2.0,
+    "py_datacuration._datatable": 2.0,
+    "py_datacuration._profile": 2.5,
+    "py_datacuration._filter": 2.0,
+    "py_datacuration._colindex": 2.0,
+    "py_datacuration._dedup": 2.0,
+    "py_datacuration._counts": 2.5,
+    "py_datacuration._pipeline": 2.0,
+    "py_datacuration._curate": 2.5,
+    "py_datacuration._display": 0.5,
+    "py_datacuration._mysql_db": 1.5,
+    "py_datacuration._nb": 2.5,
+}
+
+STR_TIMER = '''
+import sys, time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t)
+print(",".join(m for m in {heavy} if m in sys.modules))
+'''
+
+
+def timeImport(strModule):
+    '''
+    Import a module in a fresh process and return (seconds, heavy modules loaded), or None if a dependency is missing.
+    '''
+    lstTimes = []
+    for i in range(INT_RUNS):
+        objRun = subprocess.run([sys.executable, "-c", STR_TIMER.format(module=strModule, heavy=LST_HEAVY)], capture_output=True, text=True)
+        if objRun.returncode != 0:
+            print(f"{strModule:32} skipped ({objRun.stderr.strip().splitlines()[-1]})")
+            return None
+        strTime, strLoaded = objRun.stdout.splitlines()
+        lstTimes.append(float(strTime))
+    return min(lstTimes), [m for m in strLoaded.split(",") if m]
+
+
+def checkLazyNames():
+    '''
+    Every public name of the submodules should be listed in the lazy map of `py_datacuration/__init__.py`.
+    '''
+    import importlib, inspect
+    import py_datacuration
+    lstMissing = []
+    for strModule in py_datacuration._SUBMODULES:
+        try:
+            objModule = importlib.import_module("py_datacuration." + strModule)
+        except ImportError:
+            continue
+        for strName, objMember in vars(objModule).items():
+            if not strName.startswith("_") and (inspect.isfunction(objMember) or inspect.isclass(objMember)) and objMember.__module__ == objModule.__name__ and strName not in py_datacuration._LAZY_NAMES:
+                lstMissing.append(strModule + "." + strName)
+    return lstMissing
+
+
+lstFailures = []
+for strModule, fltBudget in DCT_BUDGETS.items():
+    vResult = timeImport(strModule)
+    if vResult is None:
+        continue
+    fltTime, lstLoaded = vResult
+    strStatus = "ok" if fltTime <= fltBudget else "OVER BUDGET"
+    print(f"{strModule:32} {fltTime*1000:8.1f} ms (budget {fltBudget*1000:.0f} ms) {strStatus}")
+    if fltTime > fltBudget:
+        lstFailures.append(strModule + " is over its import time budget")
+    if strModule in ("py_datacuration", "py_datacuration._file", "py_datacuration._export") and lstLoaded:
+        lstFailures.append(strModule + " imports " + ", ".join(lstLoaded))
+lstFailures += [strName + " is missing from the lazy names in __init__.py" for strName in checkLazyNames()]
+
+if lstFailures:
+    print("\n".join(lstFailures))
+    sys.exit(1)
+print("Import benchmarks complete")
@@ -0,0 +1,86 @@
+'''
+We use this script to compare the streaming `saveJson` writer against the previous version, which built the whole
+indented document with `json.dumps` before writing it. A large metadata-like document holding numpy and pandas values is
+generated and saved with both, and we report the time (best of several runs) and the peak memory allocated while saving.
+We run the `make benchJson` command to call this script. It exits with an error if the two files differ or the
+streaming writer uses more memory than the previous version.
+'''
+import gc, json, os, sys, tempfile, time, tracemalloc
+import numpy as np
+import pandas as pd
+from py_datacuration import NpEncoder, saveJson
+
+INT_RUNS = 3
+INT_FILES = 200
+INT_VARIABLES = 150  # variables per file
+
+
+def generateDocument(intFiles, intVariables):
+    '''
+    Build a metadata document with the kinds of values a profiling run leaves in it (numpy scalars, numpy arrays, pandas values).
+    '''
+    objRandom = np.random.default_rng(14)
+    lstFiles = []
+    for i in range(intFiles):
+        lstVariables = [{
+            "name": f"var_{j}",
+            "label": f"Variable {j} of file {i}",
+            "intUniqueValues": objRandom.integers(1, 100000),
+            "fltMean": objRandom.normal(),
+            "blnUnique": np.bool_(objRandom.random() < 0.5),
+            "lstSample": objRandom.integers(0, 100, 10),
+            "srCounts": pd.Series(objRandom.integers(0, 1000, 5)),
+            "dtmFirst": pd.Timestamp("2020-01-01") + pd.Timedelta(days=int(objRandom.integers(0, 1000))),
+            "vMissing": pd.NA,
+        } for j in range(intVariables)]
+        lstFiles.append({"strFileName": f"file_{i}.csv", "recordCount": np.int64(objRandom.integers(1000, 10000000)), "variables": lstVariables})
+    return {"about": "Generated document for the JSON writer benchmark", "files": lstFiles}
+
+
+def saveJsonDumps(obj, strFileOutPath):
+    '''
+    The previous `saveJson`: the whole document is encoded to one string before it is written.
+    '''
+    with open(strFileOutPath, mode='w') as jsonFile:
+        jsonFile.write(json.dumps(obj, indent=2, allow_nan=False, cls=NpEncoder))
+
+
+def measure(fnSave, obj, strFilePath):
+    '''
+    Return (best seconds, peak bytes allocated) for saving a document. The peak is measured in a separate run, since tracing slows down every allocation.
+    '''
+    lstTimes = []
+    for i in range(INT_RUNS):
+        gc.collect()
+        t = time.perf_counter()
+        fnSave(obj, strFilePath)
+        lstTimes.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fnSave(obj, strFilePath)
+    intPeak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(lstTimes), intPeak
+
+
+lstFailures = []
+objDocument = generateDocument(INT_FILES, INT_VARIABLES)
+with tempfile.TemporaryDirectory() as strTmpDir:
+    dctPaths = {"json.dumps (previous)": os.path.join(strTmpDir, "dumps.json"), "saveJson (streaming)": os.path.join(strTmpDir, "stream.json")}
+    dctResults = {
+        "json.dumps (previous)": measure(saveJsonDumps, objDocument, dctPaths["json.dumps (previous)"]),
+        "saveJson (streaming)": measure(saveJson, objDocument, dctPaths["saveJson (streaming)"]),
+    }
+    fltMb = os.path.getsize(dctPaths["saveJson (streaming)"]) / 1e6
+    print(f"{INT_FILES} files x {INT_VARIABLES} variables, {fltMb:.1f} MB")
+    for strName, (fltTime, intPeak) in dctResults.items():
+        print(f"{strName:24} {fltTime*1000:8.1f} ms {fltMb/fltTime:8.1f} MB/s  peak {intPeak/1e6:8.1f} MB")
+    with open(dctPaths["json.dumps (previous)"], "rb") as f1, open(dctPaths["saveJson (streaming)"], "rb") as f2:
+        if f1.read() != f2.read():
+            lstFailures.append("saveJson writes a different file than the previous version")
+if dctResults["saveJson (streaming)"][1] > dctResults["json.dumps (previous)"][1]:
+    lstFailures.append("saveJson uses more memory than the previous version")
+
+if lstFailures:
+    print("\n".join(lstFailures))
+    sys.exit(1)
+print("JSON benchmarks complete")
@@ -0,0 +1,102 @@
+'''
+We use this script to measure the throughput of validating large `DatasetMetadata` documents. A metadata file with many
+files and variables is generated in a temporary directory and validated with the old two-step path (parse to dicts with
+`jsonModelValidate`, then validate through the model classes), with `datasetModelValidate` (whole and truncated) and with
+`DatasetStreamValidator` fed in blocks. Every path must give the same files as the two-step path.
+We run the `make benchModel` command to call this script. It exits with an error if a result differs or the one-step
+validation is slower than the two-step path.
+'''
+import gc, os, random, sys, tempfile, time
+from py_datacuration import DatasetStreamValidator, datasetModelValidate, jsonModelValidate, saveJson
+from py_datacuration.DatasetModel import DatasetMetadata
+
+INT_RUNS = 3
+INT_FILES = 200
+INT_VARIABLES = 150  # variables per file
+INT_BLOCK_SIZE = 1024 * 1024  # bytes fed to the stream validator at a time
+
+
+def generateMetadata(intFiles, intVariables):
+    '''
+    Build a metadata document shaped like the ones `profileDataFile` produces (a mix of categorical, numeric and text variables).
+    '''
+    lstFiles = []
+    for i in range(intFiles):
+        lstVariables = []
+        for j in range(intVariables):
+            strFormat = random.choice(["categorical", "numeric", "text"])
+            dctValue = {"format": strFormat, "dataType": random.choice(["int", "float", "str"]), "unique": random.choice(["True", "False"])}
+            if strFormat == "categorical":
+                dctValue["category"] = {str(k): "Label " + str(k) for k in range(random.randint(2, 12))}
+            lstVariables.append({"name": f"var_{j}", "label": f"Variable {j} of file {i}", "value": dctValue, "intUniqueValues": random.randint(1, 100000)})
+        lstFiles.append({
+            "strFileName": f"file_{i}.csv",
+            "recordCount": random.randint(1000, 10000000),
+            "format": "csv",
+            "strDirectoryLabel": "data",
+            "strDataDescription": f"Generated file {i} with \"quoted\" text",
+            "lstCatgories": ["survey", "generated"],
+            "variables": lstVariables,
+        })
+    return {"about": "Generated metadata for the validation benchmark", "files": lstFiles}
+
+
+def bestTime(fnRun):
+    '''
+    Run a function several times and return (best seconds, result of the last run).
+    The garbage collector is paused while timing (as `timeit` does), since collecting the previous run's objects would be counted otherwise.
+    '''
+    lstTimes = []
+    for i in range(INT_RUNS):
+        vResult = None
+        gc.collect()
+        gc.disable()
+        t = time.perf_counter()
+        vResult = fnRun()
+        lstTimes.append(time.perf_counter() - t)
+        gc.enable()
+    return min(lstTimes), vResult
+
+
+def validateTwoStep(bytJson):
+    return DatasetMetadata.model_validate(jsonModelValidate(bytJson, allow_partial=False))
+
+
+def validateStream(strFilePath):
+    objStream = DatasetStreamValidator()
+    with open(strFilePath, "rb") as f:
+        for bytBlock in iter(lambda: f.read(INT_BLOCK_SIZE), b""):
+            objStream.feed(bytBlock)
+    return objStream.close()
+
+
+random.seed(16)
+lstFailures = []
+with tempfile.TemporaryDirectory() as strTmpDir:
+    strFilePath = os.path.join(strTmpDir, "gen.metadata.json")
+    saveJson(generateMetadata(INT_FILES, INT_VARIABLES), strFilePath)
+    with open(strFilePath, "rb") as f:
+        bytJson = f.read()
+    bytTruncated = bytJson[:len(bytJson) // 2]
+    fltMb = len(bytJson) / 1e6
+    print(f"{INT_FILES} files x {INT_VARIABLES} variables, {fltMb:.1f} MB")
+
+    fltBase, objBase = bestTime(lambda: validateTwoStep(bytJson))
+    dctResults = {
+        "datasetModelValidate": bestTime(lambda: datasetModelValidate(bytJson)),
+        "datasetModelValidate (partial)": bestTime(lambda: datasetModelValidate(bytTruncated, blnPartial=True)),
+        "DatasetStreamValidator": bestTime(lambda: validateStream(strFilePath)),
+    }
+    print(f"{'two-step (jsonModelValidate)':32} {fltBase*1000:8.1f} ms {fltMb/fltBase:8.1f} MB/s")
+    for strName, (fltTime, objResult) in dctResults.items():
+        fltSize = len(bytTruncated) / 1e6 if "partial" in strName else fltMb
+        print(f"{strName:32} {fltTime*1000:8.1f} ms {fltSize/fltTime:8.1f} MB/s")
+        if objResult.files != objBase.files[:len(objResult.files)] or ("partial" not in strName and objResult != objBase):
+            lstFailures.append(strName + " gives a different document than the two-step path")
+    if dctResults["datasetModelValidate"][0] > fltBase:
+        lstFailures.append("datasetModelValidate is slower than the two-step path")
+
+if lstFailures:
+    print("\n".join(lstFailures))
+    sys.exit(1)
+print("Model benchmarks complete")
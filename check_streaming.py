@@ -0,0 +1,158 @@
+'''
+We use this script to check that the streaming (chunked) readers and aggregations, and the Arrow read path, give exactly
+the same results as their whole-table versions. Random CSV files with mixed column types are written to a temporary
+directory and read back with several chunk sizes.
+We run the `make checkStreaming` command to call this script. It exits with an error if a result differs.
+'''
+import datetime, os, random, sqlite3, sys, tempfile, warnings
+import pandas as pd
+from sqlalchemy import create_engine
+from py_datacuration import MySql, dropCsvDupRecords, dropDfDupRecords, getValueCountsFiles, profileDataFile, readCsvStandard, readCsvStandardChunks
+
+INT_FILES = 60
+INT_DEDUP_FILES = 10  # the deduplication check starts worker processes, so it uses fewer files
+LST_CHUNK_ROWS = [1, 2, 3, 7, 1000]
+
+# generators of cell text; each column of a random file uses one of them
+LST_GENERATORS = [
+    lambda: random.choice(["4.0", "5.0", "4.5", ""]),
+    lambda: str(random.randint(-5, 5)),
+    lambda: random.choice([str(random.randint(0, 9)), ""]),
+    lambda: random.choice(["True", "false", "TRUE", ""]),
+    lambda: random.choice(["a", "1", "2.5", "", "None", "NA"]),
+    lambda: random.choice(["1e3", "2", "-0.5", "inf"]),
+    lambda: random.choice(["9007199254740993", "1"]),
+    lambda: "",
+    lambda: random.choice(["1", "2"]) if random.random() < 0.98 else "x",
+    lambda: random.choice(["True", "False"]) if random.random() < 0.95 else "3",
+]
+
+
+def writeRandomCsv(strFilePath):
+    '''
+    Write a small CSV file with a random selection of column types (the review example `4.0,5.0,4.5,4.0` is one of them).
+    '''
+    lstColumns = random.sample(range(len(LST_GENERATORS)), random.randint(1, 6))
+    lstLines = [",".join("c" + str(i) for i in lstColumns)]
+    lstLines += [",".join('"' + LST_GENERATORS[i]() + '"' for i in lstColumns) for _ in range(random.randint(1, 40))]
+    with open(strFilePath, "w", encoding="utf-8") as f:
+        f.write("\n".join(lstLines) + "\n")
+
+
+def checkChunks(strFilePath):
+    '''
+    The chunks of `readCsvStandardChunks` put together must equal `readCsvStandard` for every chunk size.
+    '''
+    dfWhole = readCsvStandard(strFilePath)
+    return [intChunkRows for intChunkRows in LST_CHUNK_ROWS if not pd.concat(list(readCsvStandardChunks(strFilePath, intChunkRows))).equals(dfWhole)]
+
+
+def checkArrow(strFilePath):
+    '''
+    `readCsvStandard(..., blnArrow=True)` must give the same values as the default path, only stored in Arrow columns.
+    '''
+    dfWhole = readCsvStandard(strFilePath)
+    dfArrow = readCsvStandard(strFilePath, blnArrow=True)
+    return list(dfArrow.columns) == list(dfWhole.columns) and dfArrow.values.tolist() == dfWhole.values.tolist() and all(objDtype.storage == "pyarrow" for objDtype in dfArrow.dtypes)
+
+
+def checkQuery(strTmpDir):
+    '''
+    The chunks of `MySql.queryChunks` put together must be the same for every chunk size (run against SQLite, which SQLAlchemy streams the same way).
+    '''
+    strDbPath = os.path.join(strTmpDir, "query.db")
+    with sqlite3.connect(strDbPath) as objConn:
+        objConn.execute("CREATE TABLE t (r REAL, w REAL, i INTEGER, s TEXT, d TIMESTAMP)")
+        objConn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?)", [(4.0, 1.0, 1, "a", datetime.datetime(2020, 1, 1)), (4.5, None, None, None, None), (4.0, 2.0, 3, "c", datetime.datetime(2020, 1, 1, 10, 0, 0, 500000))]
+                            + [(random.choice([4.0, 5.0, 4.5, None]), random.choice([1.0, 2.0, None]), random.choice([1, 2, None]), random.choice(["a", "1", None]),
+                                random.choice([None, datetime.datetime(2021, 5, 3), datetime.datetime(2021, 5, 3, 10, 0, 0, random.randint(0, 1))])) for _ in range(40)])
+    objDb = MySql.__new__(MySql)  # only the engine is needed
+    objDb.db_engine = create_engine("sqlite:///" + strDbPath, connect_args={"detect_types": sqlite3.PARSE_DECLTYPES})
+    lstFailed = []
+    if pd.concat(list(objDb.queryChunks("SELECT r FROM t LIMIT 3", intChunkRows=1)))["r"].tolist() != ["4.0", "4.5", "4.0"]:  # the review example
+        lstFailed.append(1)
+    dfWhole = next(objDb.queryChunks("SELECT * FROM t", intChunkRows=1000))
+    for intChunkRows in LST_CHUNK_ROWS:
+        if pd.concat(list(objDb.queryChunks("SELECT * FROM t", intChunkRows=intChunkRows))).values.tolist() != dfWhole.values.tolist():
+            lstFailed.append(intChunkRows)
+    objDb.db_engine.dispose()
+    return lstFailed
+
+
+def checkDedup(strFilePath, strTmpDir):
+    '''
+    `dropCsvDupRecords` must keep the same rows, in the same order, as `dropDfDupRecords` on the whole table for every keep option and chunk size.
+    '''
+    dfWhole = readCsvStandard(strFilePath)
+    lstKeys = list(dfWhole.columns[:2])
+    strOutPath = os.path.join(strTmpDir, "dedup.csv")
+    lstFailed = []
+    for strKeepRecord in ['first', 'last', False]:
+        dfExpected = dropDfDupRecords(dfWhole, lstKeys, strKeepRecord).reset_index(drop=True)
+        for intChunkRows in LST_CHUNK_ROWS:
+            dropCsvDupRecords(strFilePath, strOutPath, lstKeys, strKeepRecord, intPartitions=4, intChunkRows=intChunkRows, intWorkers=2)
+            dfOut = pd.read_csv(strOutPath, dtype=str, keep_default_na=False)
+            if list(dfOut.columns) != list(dfExpected.columns) or dfOut.values.tolist() != dfExpected.values.tolist():
+                lstFailed.append((strKeepRecord, intChunkRows))
+    return lstFailed
+
+
+def checkCounts(lstFilePaths):
+    '''
+    `getValueCountsFiles` must give the same counts as `value_counts` on each whole table, summed over the files.
+    '''
+    dctExpected = {}
+    for strFilePath in lstFilePaths:
+        for strColumn, srColumn in readCsvStandard(strFilePath).items():
+            for strValue, intCount in srColumn.value_counts().items():
+                dctExpected.setdefault(strColumn, {}).setdefault(strValue, 0)
+                dctExpected[strColumn][strValue] += intCount
+    return [intChunkRows for intChunkRows in LST_CHUNK_ROWS
+            if {strColumn: srCounts.to_dict() for strColumn, srCounts in getValueCountsFiles(lstFilePaths, intChunkRows=intChunkRows, intWorkers=2).items()} != dctExpected]
+
+
+def checkProfile(strFilePath):
+    '''
+    `profileDataFile` must report the record count and the distinct values of each whole column (missing values excluded) whatever the chunk size.
+    '''
+    dfWhole = readCsvStandard(strFilePath)
+    dctExpected = {strColumn: set(srColumn[srColumn != "."]) for strColumn, srColumn in dfWhole.items()}
+    lstFailed = []
+    for intChunkRows in LST_CHUNK_ROWS:
+        objFile = profileDataFile(strFilePath, "check", "check", intChunkRows=intChunkRows, intMaxCategories=100)
+        if objFile.recordCount != len(dfWhole) or [objVariable.name for objVariable in objFile.variables] != list(dfWhole.columns):
+            lstFailed.append(intChunkRows)
+            continue
+        for objVariable in objFile.variables:
+            if objVariable.intUniqueValues != len(dctExpected[objVariable.name]) or (objVariable.value.category is not None and set(objVariable.value.category) != dctExpected[objVariable.name]):
+                lstFailed.append(intChunkRows)
+                break
+    return lstFailed
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    warnings.filterwarnings("ignore", category=RuntimeWarning)  # pandas warns when `convert_dtypes` tests `inf` for a whole number
+    lstFailures = []
+    with tempfile.TemporaryDirectory() as strTmpDir:
+        for i in range(INT_FILES):
+            strFilePath = os.path.join(strTmpDir, "check" + str(i) + ".csv")
+            writeRandomCsv(strFilePath)
+            for intChunkRows in checkChunks(strFilePath):
+                lstFailures.append("readCsvStandardChunks differs from readCsvStandard with intChunkRows=" + str(intChunkRows) + ":\n" + open(strFilePath).read())
+            if not checkArrow(strFilePath):
+                lstFailures.append("readCsvStandard with blnArrow differs from the default path:\n" + open(strFilePath).read())
+            for intChunkRows in checkProfile(strFilePath):
+                lstFailures.append("profileDataFile differs from the whole table with intChunkRows=" + str(intChunkRows) + ":\n" + open(strFilePath).read())
+            if i < INT_DEDUP_FILES:
+                for strKeepRecord, intChunkRows in checkDedup(strFilePath, strTmpDir):
+                    lstFailures.append("dropCsvDupRecords differs from dropDfDupRecords with strKeepRecord=" + str(strKeepRecord) + ", intChunkRows=" + str(intChunkRows) + ":\n" + open(strFilePath).read())
+        for intChunkRows in checkQuery(strTmpDir):
+            lstFailures.append("MySql.queryChunks differs between chunk sizes with intChunkRows=" + str(intChunkRows))
+        for intChunkRows in checkCounts([os.path.join(strTmpDir, "check" + str(i) + ".csv") for i in range(INT_FILES)]):
+            lstFailures.append("getValueCountsFiles differs from value_counts on the whole tables with intChunkRows=" + str(intChunkRows))
+    for strFailure in lstFailures:
+        print(strFailure)
+    if lstFailures:
+        sys.exit(str(len(lstFailures)) + " streaming checks failed")
+    print("Streaming checks complete")
@@ -0,0 +1,53 @@
+'''
+The py_datacuration package. Functions and classes can be imported straight from the package, e.g.
+`from py_datacuration import getMd5Hash`. Submodules (and their dependencies such as pandas, SQLAlchemy or IPython) are
+only imported the first time one of their names is used, so importing the package has no side effects and a worker that
+only needs `_file` hashing does not pay for pandas.
+'''
+import importlib
+
+_SUBMODULES = {
+    "_cache": ["DataCache"],
+    "_colindex": ["DfColumnIndex"],
+    "_counts": ["getValueCountsFiles", "valueCountsToCategory"],
+    "_curate": ["curateDatasetDirectory"],
+    "_datatable": ["dropDfColumn", "dropDfDupRecords", "subsetDfByList", "filterByDfColNotNa", "filterByDfColEqTo", "filterByDfColContains", "dfColContains",
+                   "readCsvStandard", "readCsvStandardChunks", "normalizeDfStrings", "readSasDatatable", "readSasDatatableChunks", "convertSasToCsv", "convertSasToFeather", "saveToCsv", "getRowCount",
+                   "getValueCounts", "dfMapCategories"],
+    "_dedup": ["dropCsvDupRecords", "dropDupRecordsChunks"],
+    "_display": ["fileNaturalSize", "numIntComma"],
+    "_encoding": ["replace_non_ascii_with_replacement_char"],
+    "_export": ["getJupyterPath", "exportNotebookToReadme", "exportSleep"],
+    "_file": ["findFile", "listDirContents", "isDirectory", "isFile", "DirectoryIndex", "getModuleFuncsFromPath", "getSha2Hash", "getMd5Hash",
+              "getFileHashes", "getBatchHashes"],
+    "_filter": ["DfFilter"],
+    "_json": ["validJson", "validJsonBatch", "getNestedElement", "compileNestedPath", "getNestedElements", "convertDictKeysToInt", "saveJson", "writeJson", "NpEncoder"],
+    "_manifest": ["HashManifest"],
+    "_model": ["jsonModelValidate", "getModelAdapter", "datasetModelValidate", "DatasetStreamValidator"],
+    "_mysql_db": ["MySql"],
+    "_nb": ["ClearOutput", "showTable", "toMarkdown"],
+    "_pipeline": ["CsvPipeline"],
+    "_profile": ["profileDataFile"],
+    "_pyth": ["getClassMethods", "getDateTime"],
+    "_rowcount": ["countCsvRows"],
+    "DatasetModel": ["Value", "Ontology", "Variable", "File", "DatasetMetadata"],
+}
+_LAZY_NAMES = {strName: strModule for strModule, lstNames in _SUBMODULES.items() for strName in lstNames}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(strName):
+    '''
+    Import the submodule that defines a name the first time the name is used (PEP 562).
+    '''
+    strModule = _LAZY_NAMES.get(strName)
+    if strModule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {strName!r}")
+    vValue = getattr(importlib.import_module("." + strModule, __name__), strName)
+    globals()[strName] = vValue  # later lookups skip `__getattr__`
+    return vValue
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,150 @@
+'''
+This module contains an on-disk cache for parsed data tables. Normalized dataframes are stored in the columnar Feather
+(Arrow IPC) format and keyed on the hash of the source file plus the options used to read it, so re-reading the same raw
+CSV or SAS file in another notebook only costs a hash and a Feather load.
+'''
+import hashlib, json, os, uuid
+import pandas as pd
+from ._datatable import _importPyarrow
+from ._file import getMd5Hash, getSha2Hash
+
+
+class DataCache():
+    def __init__(self, strCacheDir, intMaxBytes=10 * 1024**3, strHash="md5"):
+        """
+        Create (or reuse) a cache directory for parsed data tables. Requires pyarrow (the tables are stored as Feather files).
+
+         Parameters
+         ----------
+         strCacheDir : str "Directory where the cached tables are stored (created if missing)."
+         intMaxBytes : int "Total size the cache may grow to before the least recently used tables are removed; defaults to 10 GB."
+         strHash : str "Which file hash to key the cache on, `md5` (getMd5Hash) or `sha2` (getSha2Hash)."
+
+         Example
+         ----------
+         objCache = DataCache(os.path.join(strDatasetPath, ".cache"))
+         df = readCsvStandard(strRawDataFile, objCache=objCache)
+        """
+        if strHash not in ("md5", "sha2"):
+            raise RuntimeError("***ERROR: strHash must be `md5` or `sha2`***")
+        _importPyarrow()  # the tables are stored as Feather files, so fail here rather than on the first `put`
+        self.strCacheDir = strCacheDir
+        self.intMaxBytes = intMaxBytes
+        self.funcHash = getMd5Hash if strHash == "md5" else getSha2Hash
+        os.makedirs(strCacheDir, exist_ok=True)
+
+
+    def getKey(self, strFilePath, dctOptions):
+        """
+        Build the cache key for a file and the options used to read it (the same file read with different options is cached separately).
+
+         Parameters
+         ----------
+         strFilePath : str "Path to the source data file."
+         dctOptions : dict "Read options such as the reader name, row limit and separator."
+
+         Returns
+         ----------
+         String
+        """
+        strOptions = json.dumps(dctOptions, sort_keys=True, default=str)
+        return hashlib.sha256((self.funcHash(strFilePath) + strOptions).encode("utf-8")).hexdigest()
+
+
+    def get(self, strKey):
+        """
+        Return the cached dataframe for a key, or None if it is not cached (or its file cannot be read).
+
+         Parameters
+         ----------
+         strKey : str "Key from `getKey`."
+
+         Returns
+         ----------
+         dataframe or None
+        """
+        strPath = self._keyPath(strKey)
+        pa, _ = _importPyarrow()
+        try:
+            df = pd.read_feather(strPath)
+        except (OSError, ValueError, pa.ArrowException):  # a damaged or partly written table (`ArrowInvalid` is a `ValueError`) counts as a miss and is replaced by the next `put`
+            return None
+        try:
+            os.utime(strPath)  # the modification time records the last use for eviction
+        except FileNotFoundError:  # another process evicted it after we read it
+            pass
+        return df
+
+
+    def put(self, strKey, df):
+        """
+        Store a dataframe under a key and evict the least recently used tables if the cache grows past `intMaxBytes`.
+
+         Parameters
+         ----------
+         strKey : str "Key from `getKey`."
+         df : dataframe "The normalized dataframe to store."
+        """
+        strPath = self._keyPath(strKey)
+        strTmpPath = strPath + "." + uuid.uuid4().hex + ".tmp"
+        df.reset_index(drop=True).to_feather(strTmpPath)  # Feather only stores a default index
+        os.replace(strTmpPath, strPath)  # atomic so a reader never sees a partially written table
+        self.evict()
+
+
+    def load(self, strFilePath, dctOptions, funcRead):
+        """
+        Return the cached dataframe for a file, or call `funcRead` to parse it and cache the result.
+
+         Parameters
+         ----------
+         strFilePath : str "Path to the source data file."
+         dctOptions : dict "Read options used as part of the key."
+         funcRead : function "Called with no arguments on a cache miss and must return the normalized dataframe."
+
+         Returns
+         ----------
+         dataframe
+        """
+        strKey = self.getKey(strFilePath, dctOptions)
+        df = self.get(strKey)
+        if df is None:
+            df = funcRead()
+            self.put(strKey, df)
+        return df
+
+
+    def evict(self):
+        """
+        Remove the least recently used tables until the cache is no larger than `intMaxBytes`.
+        """
+        lstEntries = []
+        for entry in os.scandir(self.strCacheDir):
+            if entry.is_file() and entry.name.endswith(".feather"):
+                objStat = entry.stat()
+                lstEntries.append((objStat.st_mtime, objStat.st_size, entry.path))
+        intTotal = sum(intSize for _, intSize, _ in lstEntries)
+        for _, intSize, strPath in sorted(lstEntries):
+            if intTotal <= self.intMaxBytes:
+                break
+            try:
+                os.remove(strPath)
+            except FileNotFoundError:  # another process already evicted it
+                pass
+            intTotal -= intSize
+
+
+    def clear(self):
+        """
+        Remove every cached table.
+        """
+        for entry in os.scandir(self.strCacheDir):
+            if entry.is_file() and entry.name.endswith(".feather"):
+                os.remove(entry.path)
+
+
+    def _keyPath(self, strKey):
+        """
+        Path of the cached table for a key.
+        """
+        return os.path.join(self.strCacheDir, strKey + ".feather")
@@ -0,0 +1,130 @@
+'''
+This module contains a hash index over a dataframe column. The index is built once and maps every value to the positions
+of its rows, so repeated equality and list membership lookups (e.g. on a household or participant ID column) take time
+proportional to the number of matching rows instead of scanning the whole column.
+'''
+import numpy as np
+import pandas as pd
+
+
+class DfColumnIndex():
+    def __init__(self, df, strColumn):
+        """
+        Build the index for one column of a dataframe.
+        The index checks that it still matches the dataframe before every lookup and rebuilds itself if the column was replaced, rows were added or removed, or cells were edited.
+        Edits are detected through pandas' copy-on-write (always on from pandas 3): the index keeps a reference to the column, so the first edit after a build gives the table a new copy of the column
+        (that copy is the cost of the check). With copy-on-write turned off (pandas 2) cells edited in place cannot be detected, so call `invalidate` after doing that.
+
+         Parameters
+         ----------
+         df : dataframe
+         strColumn : str "Name of the column to index."
+
+         Example
+         ----------
+         objIndex = DfColumnIndex(df, "hhid")
+         for strHousehold in lstHouseholds:
+            dfHousehold = filterByDfColEqTo(df, "hhid", strHousehold, objIndex)
+        """
+        self.df = df
+        self.strColumn = strColumn
+        self.blnStale = True
+        self._build()
+
+
+    def eqTo(self, strValue):
+        """
+        Return the rows where the column is equal to a value (the same rows, in the same order, as `filterByDfColEqTo`).
+        """
+        return self.df.iloc[self.getPositions([strValue], blnMatchMissing=False)]  # `==` never matches a missing value
+
+
+    def isIn(self, lstValues):
+        """
+        Return the rows where the column value is in a list of values (the same rows, in the same order, as `subsetDfByList`).
+        """
+        return self.df.iloc[self.getPositions(lstValues)]
+
+
+    def getPositions(self, lstValues, blnMatchMissing=True):
+        """
+        Return the row positions (in table order) where the column value is in a list of values.
+        Missing values in the list (e.g. `None` or `np.nan`) match the missing cells that `Series.isin` matches them with.
+
+         Parameters
+         ----------
+         lstValues : list
+         blnMatchMissing : bool "Match missing values in the list to missing cells; defaults to True."
+
+         Returns
+         ----------
+         numpy array of row positions
+        """
+        if self.isStale():
+            self._build()
+        lstRanges = []
+        blnMissing = False
+        for vValue in dict.fromkeys(lstValues):  # ignore repeated values
+            if pd.api.types.is_scalar(vValue) and pd.isna(vValue):
+                blnMissing = True
+                continue
+            intCode = self.dctCodes.get(vValue)
+            if intCode is not None:
+                lstRanges.append(self.arrOrder[self.arrOffsets[intCode]:self.arrOffsets[intCode + 1]])
+        if blnMissing and blnMatchMissing and self.intMissing:
+            arrMissing = self.arrOrder[:self.intMissing]  # which missing values match depends on the dtype and the whole list, so `isin` decides on the missing cells only
+            lstRanges.append(arrMissing[self.srColumn.iloc[arrMissing].isin(list(lstValues)).to_numpy()])
+        if not lstRanges:
+            return np.empty(0, dtype=np.intp)
+        if len(lstRanges) == 1:
+            return lstRanges[0]  # positions of one value are already in table order
+        return np.sort(np.concatenate(lstRanges))
+
+
+    def isStale(self):
+        """
+        Whether the dataframe changed in a way that makes the index out of date (the column was replaced or edited or the number of rows changed) or `invalidate` was called.
+        """
+        return self.blnStale or len(self.df) != self.intRows or self.strColumn not in self.df.columns or not _sameData(_columnData(self.df[self.strColumn]), self.objData)
+
+
+    def invalidate(self):
+        """
+        Mark the index as out of date so it is rebuilt on the next lookup.
+        """
+        self.blnStale = True
+
+
+    def _build(self):
+        """
+        Group the row positions by value: positions are sorted by value code so each value's rows form one contiguous slice.
+        """
+        srColumn = self.df[self.strColumn]
+        arrCodes, arrUniques = pd.factorize(srColumn)
+        self.arrOrder = np.argsort(arrCodes, kind="stable")
+        self.intMissing = int(np.count_nonzero(arrCodes < 0))  # missing values (code -1) sort first
+        self.arrOffsets = self.intMissing + np.concatenate([[0], np.cumsum(np.bincount(arrCodes[arrCodes >= 0], minlength=len(arrUniques)))])
+        self.dctCodes = dict(zip(arrUniques.tolist() if hasattr(arrUniques, "tolist") else list(arrUniques), range(len(arrUniques))))
+        self.intRows = len(self.df)
+        self.srColumn = srColumn  # a reference to the column, so an edit of the table copies it (copy-on-write) and `isStale` sees new data
+        self.objData = _columnData(srColumn)  # also keeps the data alive so its memory address cannot be reused by a new column
+        self.blnStale = False
+
+
+def _columnData(srColumn):
+    '''
+    The array behind a column. Numpy-backed columns get a new wrapper on every access, so we unwrap them to the numpy array.
+    '''
+    objArray = srColumn.array
+    if isinstance(objArray, pd.arrays.NumpyExtensionArray):
+        return objArray.to_numpy()
+    return objArray
+
+
+def _sameData(objA, objB):
+    '''
+    Whether two column arrays are the same data (numpy arrays are compared by the address of their data).
+    '''
+    if isinstance(objA, np.ndarray) and isinstance(objB, np.ndarray):
+        return objA.__array_interface__["data"][0] == objB.__array_interface__["data"][0] and len(objA) == len(objB)
+    return objA is objB
@@ -0,0 +1,95 @@
+'''
+This module builds frequency tables for many columns across many data files. Each file is streamed in chunks by a
+worker process that keeps partial counts for every requested column; the partial counts of all files are merged at the
+end, so a whole dataset release can be counted without loading any table in full.
+'''
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from ._datatable import _inferCsvTypes, _normalizeTyped, _readCsvTypedChunks
+from ._profile import MISSING_VALUE, _inferDataType, _sortValues
+
+INT_MERGE_EVERY = 16  # number of chunk counts kept per column before they are combined
+
+
+def getValueCountsFiles(vFiles, lstColumns=None, intChunkRows=100000, intWorkers=4, vSep=',', blnDropMissing=False):
+    '''
+    Streaming version of `getValueCounts` for many columns and files: count the records for each unique value of every column, summed over all of the files.
+    Values are normalized the same way as `readCsvStandard` (every value a string and empty cells set to `.`), so the counts match `getValueCounts` on the whole table.
+
+     Parameters
+     ----------
+     vFiles : list or string (a list of CSV file paths, or a directory whose `.csv` files (including subdirectories) are counted)
+     lstColumns : list (the columns to count; defaults to every column; a file without one of the columns just adds no counts for it)
+     intChunkRows : int (number of rows read at a time; defaults to 100000)
+     intWorkers : int (number of files counted at the same time, each in its own process; defaults to 4)
+     vSep : string (column delimiter; defaults to `,`)
+     blnDropMissing : boolean (leave missing values (`.`) out of the counts; defaults to False)
+
+     Returns
+     ----------
+     Dict of column name to a series of counts (indexed by value, largest count first)
+
+     Example
+     ----------
+     dctCounts = getValueCountsFiles(strDatasetPath, ["sex", "region", "wave"])
+     objVariable.value.category = valueCountsToCategory(dctCounts["region"])
+    '''
+    if isinstance(vFiles, str):
+        vFiles = sorted(os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(vFiles) for filename in filenames if filename.lower().endswith(".csv"))
+    dctCounts = {}
+    with ProcessPoolExecutor(max_workers=intWorkers) as executor:
+        for dctFileCounts in executor.map(_countFile, vFiles, [lstColumns] * len(vFiles), [intChunkRows] * len(vFiles), [vSep] * len(vFiles)):
+            for strColumn, srCounts in dctFileCounts.items():
+                dctCounts.setdefault(strColumn, []).append(srCounts)
+    dctMerged = {strColumn: _mergeCounts(lstCounts) for strColumn, lstCounts in dctCounts.items()}
+    if blnDropMissing:
+        dctMerged = {strColumn: srCounts.drop(MISSING_VALUE, errors="ignore") for strColumn, srCounts in dctMerged.items()}
+    return dctMerged
+
+
+def valueCountsToCategory(srCounts, blnDropMissing=True):
+    '''
+    Turn value counts into the `category` dictionary of a `DatasetModel.Value`, with each value used as its own label until the labels are filled in
+    (numeric values are listed in numeric order and other values alphabetically, the same as `profileDataFile`).
+
+     Parameters
+     ----------
+     srCounts : series (counts indexed by value, e.g. from `getValueCountsFiles` or `getValueCounts`)
+     blnDropMissing : boolean (leave the missing value (`.`) out of the categories; defaults to True)
+
+     Returns
+     ----------
+     Dict of value to label (both strings)
+    '''
+    if blnDropMissing:
+        srCounts = srCounts.drop(MISSING_VALUE, errors="ignore")
+    idxValues = pd.Index([str(v) for v in srCounts.index])
+    return {v: v for v in _sortValues(idxValues, _inferDataType(idxValues))}
+
+
+def _countFile(strFilePath, lstColumns, intChunkRows, vSep):
+    '''
+    Count the values of the requested columns in one file (runs in a worker process). Only the requested columns are parsed, with the column types of the whole file (see `readCsvStandardChunks`),
+    and each chunk is counted before it is normalized: the values are formatted the same way in every chunk, so normalizing the counted values gives the same strings for a fraction of the work.
+    Chunk counts are combined every `INT_MERGE_EVERY` chunks so memory stays bounded by the number of distinct values.
+    '''
+    dctTypes = _inferCsvTypes(strFilePath, intChunkRows, vSep=vSep, lstColumns=lstColumns)
+    dctPartial = {}
+    for dfChunk in _readCsvTypedChunks(strFilePath, dctTypes, intChunkRows, vSep=vSep):
+        for strColumn in dfChunk.columns:
+            srCounts = dfChunk[strColumn].value_counts(dropna=False)
+            srCounts.index = pd.Index(_normalizeTyped(srCounts.index.to_frame(index=False), dctTypes)[strColumn], name=strColumn)
+            lstCounts = dctPartial.setdefault(strColumn, [])
+            lstCounts.append(srCounts)
+            if len(lstCounts) >= INT_MERGE_EVERY:
+                dctPartial[strColumn] = [_mergeCounts(lstCounts)]
+    return {strColumn: _mergeCounts(lstCounts) for strColumn, lstCounts in dctPartial.items()}
+
+
+def _mergeCounts(lstCounts):
+    '''
+    Sum a list of value counts into one series ordered by count (largest first, like `value_counts`).
+    '''
+    srCounts = pd.concat(lstCounts).groupby(level=0, sort=False).sum()
+    return srCounts.sort_values(ascending=False, kind="stable").rename("count")
@@ -0,0 +1,116 @@
+'''
+This module curates a whole dataset directory at once. Every file is handed to a pool of worker processes that hash it
+and, for CSV files, count and profile it (`profileDataFile`); the per-file `DatasetModel.File` records are then merged
+into a single `DatasetModel.DatasetMetadata`. Each worker can be given a memory limit so one oversized file cannot take
+the whole machine down, and progress is reported as files finish.
+'''
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ._file import getFileHashes
+from ._profile import profileDataFile
+from ._rowcount import countCsvRows
+from .DatasetModel import DatasetMetadata, File
+
+
+def curateDatasetDirectory(strDatasetPath, strAbout=None, intWorkers=None, intMemoryLimitMB=None, blnProfile=True, intMaxCategories=20, intChunkRows=100000, vSep=',', funcProgress=None):
+    '''
+    Build the metadata of every file in a dataset directory (including subdirectories) in parallel and return it as one `DatasetModel.DatasetMetadata`.
+    Every file gets its MD5 hash; CSV files also get their record count and, with `blnProfile`, their variables (see `profileDataFile`).
+    Hidden files and directories (names starting with `.`, e.g. a `DataCache` directory) are skipped. The descriptions and categories are left empty to be filled in.
+    If a file cannot be read (e.g. a permission error) or a CSV file cannot be profiled (e.g. it does not fit in the worker's memory limit) the error is recorded in its `strAnalysisNotes` and the other files carry on.
+
+     Parameters
+     ----------
+     strDatasetPath : string (path to the dataset directory)
+     strAbout : string (the `about` reference of the metadata document)
+     intWorkers : int (number of worker processes; defaults to the number of CPUs)
+     intMemoryLimitMB : int (address space limit of each worker in MB, applied with `resource.setrlimit` where available (Linux and macOS); defaults to no limit)
+     blnProfile : boolean (profile the variables of CSV files; without it only the hash and record count are collected; defaults to True)
+     intMaxCategories : int (most distinct values a column can have to be treated as categorical; defaults to 20)
+     intChunkRows : int (number of rows read at a time; defaults to 100000)
+     vSep : string (column delimiter of the CSV files; defaults to `,`)
+     funcProgress : function (called as `funcProgress(intDone, intTotal, strFilePath)` after each file; defaults to printing a progress line)
+
+     Returns
+     ----------
+     DatasetModel.DatasetMetadata (files are listed by path within the dataset)
+
+     Example
+     ----------
+     objMetadata = curateDatasetDirectory(strDatasetPath, intWorkers=8, intMemoryLimitMB=4096)
+     saveJson(objMetadata.model_dump(exclude_none=True), strMetadataFile)
+    '''
+    lstFiles = []
+    for dirpath, dirnames, filenames in os.walk(strDatasetPath):
+        dirnames[:] = sorted(strName for strName in dirnames if not strName.startswith("."))
+        lstFiles.extend(os.path.join(dirpath, strName) for strName in filenames if not strName.startswith("."))
+    lstFiles.sort(key=_fileSize, reverse=True)  # start the largest files first so one of them does not finish last on its own
+    funcProgress = funcProgress or _printProgress
+    dctFiles = {}
+    with ProcessPoolExecutor(max_workers=intWorkers, initializer=_limitMemory, initargs=(intMemoryLimitMB,)) as executor:
+        dctFutures = {executor.submit(_curateFile, strFilePath, strDatasetPath, blnProfile, intMaxCategories, intChunkRows, vSep): strFilePath for strFilePath in lstFiles}
+        for future in as_completed(dctFutures):
+            dctFiles[dctFutures[future]] = future.result()
+            funcProgress(len(dctFiles), len(lstFiles), dctFutures[future])
+    return DatasetMetadata(about=strAbout, files=[dctFiles[strFilePath] for strFilePath in sorted(dctFiles, key=lambda strFilePath: os.path.relpath(strFilePath, strDatasetPath))])
+
+
+def _curateFile(strFilePath, strDatasetPath, blnProfile, intMaxCategories, intChunkRows, vSep):
+    '''
+    Build the `File` record of one file (runs in a worker process).
+    '''
+    strDirectoryLabel = os.path.relpath(os.path.dirname(strFilePath), strDatasetPath).replace(os.sep, "/")
+    strDirectoryLabel = "" if strDirectoryLabel == "." else strDirectoryLabel
+    strFormat = os.path.splitext(strFilePath)[1].lstrip(".").lower() or None
+    objFile = File(strFileName=os.path.basename(strFilePath), format=strFormat, strDirectoryLabel=strDirectoryLabel, strDataDescription="", lstCatgories=[])
+    try:
+        objFile.md5Hash = getFileHashes(strFilePath, ["md5"])["md5"]
+    except OSError as e:  # e.g. a permission error; the file is still listed and the other files carry on
+        objFile.strAnalysisNotes = "Not hashed: " + (type(e).__name__ + " " + str(e)).strip()
+        return objFile
+    if strFormat != "csv":
+        return objFile
+    try:
+        if blnProfile:
+            strMd5 = objFile.md5Hash
+            objFile = profileDataFile(strFilePath, strDirectoryLabel, "", [], intMaxCategories, intChunkRows, 1, vSep)  # the processes already use every core, so one thread per file
+            objFile.md5Hash = strMd5
+        else:
+            objFile.recordCount = countCsvRows(strFilePath)
+    except (MemoryError, ValueError, UnicodeDecodeError, OSError) as e:
+        objFile.strAnalysisNotes = "Not profiled: " + (type(e).__name__ + " " + str(e)).strip()
+    return objFile
+
+
+def _fileSize(strFilePath):
+    '''
+    Size of a file for ordering the work, 0 if it cannot be read (its error is then recorded by `_curateFile`).
+    '''
+    try:
+        return os.path.getsize(strFilePath)
+    except OSError:
+        return 0
+
+
+def _limitMemory(intMemoryLimitMB):
+    '''
+    Limit the address space of a worker process (runs once when the worker starts).
+    '''
+    if intMemoryLimitMB is None:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows has no resource limits, so the workers run without one
+        return
+    intLimit = int(intMemoryLimitMB) * 1024 * 1024
+    intSoft, intHard = resource.getrlimit(resource.RLIMIT_AS)
+    if intHard != resource.RLIM_INFINITY:
+        intLimit = min(intLimit, intHard)
+    resource.setrlimit(resource.RLIMIT_AS, (intLimit, intHard))
+
+
+def _printProgress(intDone, intTotal, strFilePath):
+    '''
+    Default progress report: one line per finished file.
+    '''
+    print("Curated " + str(intDone) + "/" + str(intTotal) + ": " + os.path.basename(strFilePath))
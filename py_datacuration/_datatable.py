@@ -1,8 +1,13 @@
 '''
 This module will contain functions that help process datatables.
 '''
+import io, os, re, uuid
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
+from ._rowcount import countCsvRows
+
+LST_BOOL_TEXT = ["True", "TRUE", "true", "False", "FALSE", "false"]  # the text pandas reads as booleans
 
 def dropDfColumn(df, strColumn):
     '''
@@ -37,7 +42,7 @@ def dropDfDupRecords(df, lstColumns, strKeepRecord='last'):
     return df.drop_duplicates(subset=lstColumns, keep=strKeepRecord) # only keep unique household IDs
 
 
-def subsetDfByList(df, strColumn, lstValues):
+def subsetDfByList(df, strColumn, lstValues, objIndex=None):
     '''
     Returns a subset of a data table based on a list of values in a column.
 
@@ -46,11 +51,14 @@ def subsetDfByList(df, strColumn, lstValues):
      df : dataframe 
      strColumn : string (name of dataframe column to search for values)
      lstValues : list (list of values to filter the column by)
+     objIndex : DfColumnIndex (optional index of the column; the matching rows are then looked up instead of scanning the column, and the index rebuilds itself first if the table was edited)
 
      Return
      ----------
      dataframe
     '''
+    if objIndex is not None and objIndex.df is df and objIndex.strColumn == strColumn:
+        return objIndex.isIn(lstValues)
     return df[df[strColumn].isin(lstValues)]
 
 
@@ -70,7 +78,7 @@ def filterByDfColNotNa(df, strColumn):
     return df[df[strColumn].notna()]
 
 
-def filterByDfColEqTo(df, strColumn, strValue):
+def filterByDfColEqTo(df, strColumn, strValue, objIndex=None):
     '''
     Filter a dataframe where a column is equal to a value.
     ...
@@ -80,25 +88,31 @@ def filterByDfColEqTo(df, strColumn, strValue):
      df : dataframe 
      strColumn : str (dataframe column to filter by)
      strValue : string (value to filter by)
+     objIndex : DfColumnIndex (optional index of the column; the matching rows are then looked up instead of scanning the column, and the index rebuilds itself first if the table was edited)
 
      Return
      ----------
      dataframe
     '''
+    if objIndex is not None and objIndex.df is df and objIndex.strColumn == strColumn:
+        return objIndex.eqTo(strValue)
     return df[df[strColumn] == strValue]
 
 
-def filterByDfColContains(df, strColumn, strValue, blnCase=True):
+def filterByDfColContains(df, strColumn, strValue, blnCase=True, blnRegex=True, blnSkipNa=False):
     '''
     Filter a dataframe where a value is in the column.
+    `strValue` may also be a list of terms, in which case rows containing any of the terms are kept using a single pass over the column.
     ...
 
      Parameters
      ----------
      df : dataframe 
      strColumn : str (dataframe column to filter by)
-     strValue : string (value to filter by)
+     strValue : string or list (value to filter by, or a list of terms where any term may match)
      blnCase : boolean (whether to search using case sensitivity or not; defaults to case sensitive)
+     blnRegex : boolean (treat the value(s) as regular expressions; defaults to True, set to False to search for literal text which is faster)
+     blnSkipNa : boolean (treat missing values as non-matches instead of raising an error; defaults to False)
 
      Return
      ----------
@@ -109,11 +123,67 @@ def filterByDfColContains(df, strColumn, strValue, blnCase=True):
      dfRow = filterByDfColContains(dfFileMd, 'cdmTableName', strTableName).reset_index() # `reset_index` makes sure the
      if "tableDescription" in dfRow:
         print("DESCRIPTION:",dfRow["tableDescription"][0])
+     dfFlagged = filterByDfColContains(dfSurvey, 'comments', ["smoke", "vape", "tobacco"], blnCase=False, blnRegex=False, blnSkipNa=True)
+    '''
+    return df[dfColContains(df[strColumn], strValue, blnCase, blnRegex, blnSkipNa)]
+
+
+def dfColContains(srColumn, vValue, blnCase=True, blnRegex=True, blnSkipNa=False):
+    '''
+    Return the boolean mask used by `filterByDfColContains` for a column.
+    A list of terms is compiled into one pattern so each cell is searched once, however many terms there are; literal terms are arranged as a trie
+    (terms sharing a prefix share one branch) so the regular expression engine does not retry every term at every position.
+
+     Parameters
+     ----------
+     srColumn : series (dataframe column to search)
+     vValue : string or list (value to search for, or a list of terms where any term may match)
+     blnCase : boolean (whether to search using case sensitivity or not; defaults to case sensitive)
+     blnRegex : boolean (treat the value(s) as regular expressions; defaults to True)
+     blnSkipNa : boolean (missing values are False instead of missing; defaults to False)
+
+     Return
+     ----------
+     series of booleans
+    '''
+    dctNa = {"na": False} if blnSkipNa else {}
+    if isinstance(vValue, str):
+        return srColumn.str.contains(vValue, case=blnCase, regex=blnRegex, **dctNa)
+    lstTerms = list(dict.fromkeys(vValue))
+    if not lstTerms:
+        return pd.Series(False, index=srColumn.index)
+    if blnRegex:
+        strPattern = "|".join("(?:" + strTerm + ")" for strTerm in lstTerms)
+    else:
+        strPattern = _termsTriePattern([strTerm.lower() for strTerm in lstTerms] if not blnCase else lstTerms)
+    return srColumn.str.contains(strPattern, case=blnCase, regex=True, **dctNa)
+
+
+def _termsTriePattern(lstTerms):
+    '''
+    Build a regular expression matching any of a list of literal terms, with the terms merged into a trie
+    (e.g. `smoke`, `smoking` and `snuff` become `s(?:mok(?:e|ing)|nuff)`).
+    '''
+    dctTrie = {}
+    for strTerm in lstTerms:
+        dctNode = dctTrie
+        for strChar in strTerm:
+            dctNode = dctNode.setdefault(strChar, {})
+        dctNode[""] = {}  # marks the end of a term
+    return _triePattern(dctTrie)
+
+
+def _triePattern(dctNode):
+    '''
+    Convert one trie node (and its children) to a regular expression.
     '''
-    return df[df[strColumn].str.contains(strValue, case=blnCase)]
+    if "" in dctNode:
+        return ""  # a shorter term ends here, so anything longer can never be needed for a substring match
+    lstBranches = [re.escape(strChar) + _triePattern(dctChild) for strChar, dctChild in dctNode.items()]
+    return lstBranches[0] if len(lstBranches) == 1 else "(?:" + "|".join(lstBranches) + ")"
 
 
-def readCsvStandard(strFilePath, intRows=None, blnUseAllColumns=True, vSep=','):
+def readCsvStandard(strFilePath, intRows=None, blnUseAllColumns=True, vSep=',', blnArrow=False, objCache=None):
     '''
     This method ensures that when the CSV files are read, they are treated consistently.
     ...
@@ -122,36 +192,379 @@ def readCsvStandard(strFilePath, intRows=None, blnUseAllColumns=True, vSep=','):
      ----------
      strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
      intRows : int (number of row we want returned for large datasets where we do not need all rows)
+     blnArrow : boolean (store the strings in Arrow columns, which uses far less memory for wide tables than object columns (from pandas 3 the default string columns are already Arrow backed); the values are the same as without it, and the file is parsed in chunks (two passes, see `readCsvStandardChunks`) so only one chunk of Python objects is held at a time, which lowers the peak memory of the read at the cost of time (see `make benchArrow`); requires pyarrow)
+     objCache : DataCache (optional cache of parsed tables; on a hit the stored table is returned instead of parsing the file again)
 
      Return
      ----------
      dataframe
     '''
     if blnUseAllColumns:
-        return pd.read_csv(strFilePath, quoting=1, header=0, nrows=intRows, low_memory=False, sep=vSep).convert_dtypes().astype(pd.StringDtype()).fillna(".")  # we must convert EVERYTHING to strings since we assume the metadata categories (keys and values) will be cast to strings to ensure matches
-        # `fillna(".")` adds `.` to empty cells; we need `.convert_dtypes()` to prevent ints from becoming floats and we need to do this BEFORE calling `astype("string") which ensures everything is treated as a string`
+        if objCache is not None:
+            return objCache.load(strFilePath, {"reader": "csv", "intRows": intRows, "vSep": vSep, "blnArrow": blnArrow}, lambda: readCsvStandard(strFilePath, intRows, True, vSep, blnArrow))
+        if blnArrow:
+            _importPyarrow()
+            return pd.concat(list(readCsvStandardChunks(strFilePath, intRows=intRows, vSep=vSep, blnArrow=True)), ignore_index=True)  # only one chunk of Python objects is held at a time
+        return normalizeDfStrings(pd.read_csv(strFilePath, quoting=1, header=0, nrows=intRows, low_memory=False, sep=vSep))
     else:   # we only want the first column of data for determining the number of rows in the data table
         return pd.read_csv(strFilePath, header=0, nrows=intRows, usecols=[0], sep=vSep)
 
 
-def readSasDatatable(strFilePath):
+def _importPyarrow():
     '''
-    Simply reads a SAS file to a datatable
+    pyarrow is only needed for the opt-in Arrow read paths and `DataCache` so we do not require it at import time.
+    '''
+    try:
+        import pyarrow, pyarrow.csv
+    except ImportError:
+        raise RuntimeError("***ERROR: pyarrow must be installed to use the Arrow read path or DataCache (pip install pyarrow)***")
+    return pyarrow, pyarrow.csv
+
+
+def readCsvStandardChunks(strFilePath, intChunkRows=100000, intRows=None, vSep=',', lstColumns=None, blnNormalize=True, blnArrow=False):
+    '''
+    Streaming version of `readCsvStandard` for CSV files too large to hold in memory. Yields dataframes of at most `intChunkRows` rows, each normalized the same way as `readCsvStandard` (every value a string and empty cells set to `.`).
+    The type of each column is inferred over the whole file in a first pass (a number is written as `4.0` in every chunk if any value of the column is not whole), so the chunks put together are identical to `readCsvStandard`.
     ...
 
      Parameters
      ----------
      strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
-     intRows : int (number of row we want returned for large datasets where we do not need all rows)
+     intChunkRows : int (number of rows in each dataframe yielded; defaults to 100000)
+     intRows : int (total number of rows we want returned for large datasets where we do not need all rows)
+     vSep : string (column delimiter; defaults to `,`)
+     lstColumns : list (only parse these columns, in file order; columns the file does not have are ignored; defaults to every column)
+     blnNormalize : boolean (cast every value to a string with empty cells set to `.`; without it the chunks keep the column types inferred for the whole file; defaults to True)
+     blnArrow : boolean (store the normalized strings in Arrow columns instead of Python objects; requires pyarrow)
+
+     Return
+     ----------
+     generator of dataframes
+
+     Example
+     ----------
+     for dfChunk in readCsvStandardChunks(strRawDataFile, 50000):
+        saveToCsv(strOutFile, dropDfColumn(dfChunk, "ssn"))
+    '''
+    dctTypes = _inferCsvTypes(strFilePath, intChunkRows, intRows, vSep, lstColumns)
+    for df in _readCsvTypedChunks(strFilePath, dctTypes, intChunkRows, intRows, vSep):
+        yield _normalizeTyped(df, dctTypes, blnArrow) if blnNormalize else df
+
+
+def _inferCsvTypes(strFilePath, intChunkRows=100000, intRows=None, vSep=',', lstColumns=None):
+    '''
+    First pass of `readCsvStandardChunks`: find the type pandas would infer for each whole column. Every chunk contributes a few witness values that decide the inference
+    (a missing value, the smallest and largest integer, a float, a boolean, a value that is not a number or not a boolean), and pandas infers the type from the witnesses.
+    We also record whether a float column only holds whole numbers (then `convert_dtypes` makes it an integer column).
+    Returns {column: (dtype to read with, nullable dtype to cast to or None)}.
+    '''
+    dctWitnesses = {}
+    dctWhole = {}
+    for df in _readCsvChunks(strFilePath, intChunkRows, intRows, vSep, lstColumns):
+        for strColumn in df.columns:
+            setWitnesses = dctWitnesses.setdefault(strColumn, set())
+            srColumn = df[strColumn]
+            arrNa = srColumn.isna().to_numpy()
+            if arrNa.any():
+                setWitnesses.add("")
+            srValues = srColumn[~arrNa]
+            if len(srValues) == 0:
+                continue
+            strKind = srColumn.dtype.kind
+            if strKind in "iuf":
+                arrFloats = srValues.to_numpy().astype(np.float64)
+                with np.errstate(invalid="ignore"):
+                    dctWhole[strColumn] = dctWhole.get(strColumn, True) and bool((arrFloats.astype(np.int64) == arrFloats).all())  # the test `convert_dtypes` uses
+                if strKind == "f":
+                    setWitnesses.add(repr(float(srValues.iloc[0])))
+                else:
+                    setWitnesses.update([str(srValues.min()), str(srValues.max())])
+            elif strKind == "b" or pd.api.types.infer_dtype(srValues, skipna=True) == "boolean":
+                setWitnesses.add(str(bool(srValues.iloc[0])))
+            else:  # text as written in the file
+                arrNumeric = pd.to_numeric(srValues, errors="coerce").notna().to_numpy()
+                arrBool = srValues.isin(LST_BOOL_TEXT).to_numpy()
+                arrNeither = ~arrNumeric & ~arrBool
+                if arrNeither.any():
+                    setWitnesses.add(srValues.iloc[int(np.argmax(arrNeither))])
+                else:
+                    setWitnesses.update([srValues.iloc[int(np.argmax(~arrNumeric))], srValues.iloc[int(np.argmax(~arrBool))]])
+    dctTypes = {}
+    for strColumn, setWitnesses in dctWitnesses.items():
+        srWitnesses = _parseCells(sorted(setWitnesses))
+        strKind = srWitnesses.dtype.kind
+        if strKind == "i":
+            dctTypes[strColumn] = ("int64", "Int64")
+        elif strKind == "u":
+            dctTypes[strColumn] = ("uint64", "UInt64")
+        elif strKind == "f":
+            dctTypes[strColumn] = ("float64", "Int64" if dctWhole.get(strColumn, True) else "Float64")
+        elif strKind == "b" or pd.api.types.infer_dtype(srWitnesses, skipna=True) == "boolean":
+            dctTypes[strColumn] = ("boolean", None)
+        else:
+            dctTypes[strColumn] = (str, None)  # text is kept exactly as written
+    return dctTypes
+
+
+def _parseCells(lstCells):
+    '''
+    Parse a list of cell texts the way `readCsvStandard` parses a column holding exactly those cells (an empty string is a missing value).
+    '''
+    return pd.read_csv(io.StringIO("x\n" + "\n".join('"' + strCell.replace('"', '""') + '"' for strCell in lstCells) + "\n"), quoting=1, header=0, low_memory=False)["x"]
+
+
+def _normalizeCells(idxCells):
+    '''
+    Normalize the distinct cells of a column read as text (missing values as NaN) to the strings `readCsvStandard` gives for them. pandas infers the type of a column
+    from the set of its values alone, so parsing the distinct cells together gives the same type, and so the same strings, as parsing the whole column.
+    '''
+    srParsed = _parseCells(["" if pd.isna(vCell) else vCell for vCell in idxCells])
+    return normalizeDfStrings(srParsed.to_frame())["x"].tolist()
+
+
+def _readCsvChunks(strFilePath, intChunkRows, intRows=None, vSep=',', lstColumns=None, dctDtypes=None):
+    '''
+    Read a CSV file in chunks with the same options as `readCsvStandard`.
+    '''
+    setColumns = None if lstColumns is None else set(lstColumns)
+    with pd.read_csv(strFilePath, quoting=1, header=0, nrows=intRows, low_memory=False, sep=vSep, chunksize=intChunkRows, dtype=dctDtypes,
+                     usecols=None if setColumns is None else (lambda strColumn: strColumn in setColumns)) as reader:
+        yield from reader
+
+
+def _readCsvTypedChunks(strFilePath, dctTypes, intChunkRows=100000, intRows=None, vSep=','):
+    '''
+    Second pass of `readCsvStandardChunks`: read the chunks with the column types of `_inferCsvTypes`.
+    '''
+    return _readCsvChunks(strFilePath, intChunkRows, intRows, vSep, list(dctTypes), {strColumn: tplType[0] for strColumn, tplType in dctTypes.items()})
+
+
+def _normalizeTyped(df, dctTypes, blnArrow=False):
+    '''
+    `normalizeDfStrings` for a chunk read by `_readCsvTypedChunks`: cast to the nullable type chosen for the whole column instead of the one `convert_dtypes` would choose for the chunk.
+    '''
+    dctCast = {strColumn: dctTypes[strColumn][1] for strColumn in df.columns if dctTypes[strColumn][1] is not None}
+    return df.astype(dctCast).astype(pd.StringDtype("pyarrow" if blnArrow else None)).fillna(".")
+
+
+def normalizeDfStrings(df, blnArrow=False):
+    '''
+    Apply the standard string normalization used when reading data tables (every value is cast to a string and missing values become `.`).
+
+     Parameters
+     ----------
+     df : dataframe
+     blnArrow : boolean (store the strings in Arrow columns instead of Python objects; requires pyarrow)
 
      Return
      ----------
      dataframe
     '''
-    df = pd.read_sas(strFilePath, encoding="utf-8").convert_dtypes()
+    return df.convert_dtypes().astype(pd.StringDtype("pyarrow" if blnArrow else None)).fillna(".")  # we must convert EVERYTHING to strings since we assume the metadata categories (keys and values) will be cast to strings to ensure matches
+    # `fillna(".")` adds `.` to empty cells; we need `.convert_dtypes()` to prevent ints from becoming floats and we need to do this BEFORE calling `astype("string") which ensures everything is treated as a string`
+
+
+def readSasDatatable(strFilePath, blnArrow=False, objCache=None, lstColumns=None, intChunkRows=100000):
+    '''
+    Simply reads a SAS file to a datatable
+    ...
+
+     Parameters
+     ----------
+     strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
+     blnArrow : boolean (return every value as an Arrow-backed string with missing values set to `.`, the same as `normalizeDfStrings(readSasDatatable(...), True)`; requires pyarrow)
+     objCache : DataCache (optional cache of parsed tables; on a hit the stored table is returned instead of parsing the file again)
+     lstColumns : list (only keep these columns; the file is then read in chunks of `intChunkRows` rows so the dropped columns are never held for the whole file)
+     intChunkRows : int (number of rows read at a time when `lstColumns` is given; defaults to 100000)
+
+     Return
+     ----------
+     dataframe (NOTE: without `blnArrow` the columns keep their types (`convert_dtypes`); with it every column is a string like `readCsvStandard`, so the flag changes the values returned and not only their storage)
+    '''
+    if objCache is not None:
+        return objCache.load(strFilePath, {"reader": "sas", "blnArrow": blnArrow, "lstColumns": lstColumns}, lambda: readSasDatatable(strFilePath, blnArrow, lstColumns=lstColumns, intChunkRows=intChunkRows))
+    if lstColumns is None:
+        df = pd.read_sas(strFilePath, encoding="utf-8")
+    else:
+        df = pd.concat(list(_iterSasChunks(strFilePath, intChunkRows, lstColumns)), ignore_index=True)
+    df = df.convert_dtypes()
+    if blnArrow:
+        _importPyarrow()
+        return normalizeDfStrings(df, True)
     return df
 
 
+def readSasDatatableChunks(strFilePath, intChunkRows=100000, lstColumns=None, intRows=None, blnArrow=False, blnNormalize=True):
+    '''
+    Streaming version of `readSasDatatable` for SAS7BDAT or XPORT files too large to hold in memory. Yields dataframes of at most `intChunkRows` rows,
+    each normalized the same way as `readCsvStandardChunks` (every value a string and empty cells set to `.`).
+    SAS numbers are all floats, so a first pass over the file finds which numeric columns only hold whole numbers and how precise each date column is (a number is written as `4.0` in every chunk if any value of the column is not whole),
+    and the chunks put together are identical to `normalizeDfStrings(readSasDatatable(...))`.
+    ...
+
+     Parameters
+     ----------
+     strFilePath : string (path to the SAS file; NOTE: this should be the absolute path to the file)
+     intChunkRows : int (number of rows in each dataframe yielded; defaults to 100000)
+     lstColumns : list (only keep these columns, in this order; defaults to every column)
+     intRows : int (total number of rows we want returned for large datasets where we do not need all rows)
+     blnArrow : boolean (store the strings in Arrow columns instead of Python objects; requires pyarrow)
+     blnNormalize : boolean (cast every value to a string with empty cells set to `.`; without it the chunks keep the types pandas reads (every number a float) and the first pass is skipped; defaults to True)
+
+     Return
+     ----------
+     generator of dataframes
+
+     Example
+     ----------
+     for dfChunk in readSasDatatableChunks(strRawDataFile, 50000, ["hhid", "age", "wave"]):
+        saveToCsv(strOutFile, dfChunk)
+    '''
+    if not blnNormalize:
+        yield from _iterSasChunks(strFilePath, intChunkRows, lstColumns, intRows)
+        return
+    if blnArrow:
+        _importPyarrow()
+    dctCast, dctDates = _inferSasTypes(strFilePath, intChunkRows, lstColumns, intRows)
+    for df in _iterSasChunks(strFilePath, intChunkRows, lstColumns, intRows):
+        yield _normalizeSas(df, dctCast, dctDates, blnArrow)
+
+
+def _inferSasTypes(strFilePath, intChunkRows, lstColumns=None, intRows=None):
+    '''
+    First pass of `readSasDatatableChunks`: find how `normalizeDfStrings` would format each whole column.
+    Numeric columns are cast to `Int64` if every value is whole and to `Float64` otherwise. Dates are written without a time if every value is at midnight and with as many fractional digits as the finest value needs,
+    so for each date column we keep a few witness values (the first value with a time, with milliseconds, ...) that are formatted along with every chunk.
+    Returns ({column: nullable dtype to cast to}, {column: series of witness dates}).
+    '''
+    dctWhole = {}
+    dctDates = {}
+    for df in _iterSasChunks(strFilePath, intChunkRows, lstColumns, intRows):
+        for strColumn in df.columns:
+            srValues = df[strColumn].dropna()
+            strKind = df[strColumn].dtype.kind
+            if strKind == "f":
+                arrFloats = srValues.to_numpy()
+                with np.errstate(invalid="ignore"):
+                    dctWhole[strColumn] = dctWhole.get(strColumn, True) and bool((arrFloats.astype(np.int64) == arrFloats).all())  # the test `convert_dtypes` uses
+            elif strKind == "M":
+                lstWitnesses = dctDates.setdefault(strColumn, [])
+                arrInts = srValues.to_numpy().view(np.int64)
+                intPerSecond = 10 ** {"s": 0, "ms": 3, "us": 6, "ns": 9}[np.datetime_data(srValues.dtype)[0]]
+                for intUnits in [86400 * intPerSecond, intPerSecond, intPerSecond // 1000, intPerSecond // 1000000]:
+                    arrFound = (arrInts % intUnits != 0) if intUnits > 1 else np.zeros(0, dtype=bool)
+                    if arrFound.any():
+                        lstWitnesses.append(srValues.iloc[[int(np.argmax(arrFound))]])
+    dctCast = {strColumn: "Int64" if blnWhole else "Float64" for strColumn, blnWhole in dctWhole.items()}
+    return dctCast, {strColumn: pd.concat(lstWitnesses, ignore_index=True) for strColumn, lstWitnesses in dctDates.items() if lstWitnesses}
+
+
+def _normalizeSas(df, dctCast, dctDates, blnArrow=False):
+    '''
+    `normalizeDfStrings` for a chunk of a SAS file, formatted with the column types of `_inferSasTypes` instead of those of the chunk.
+    '''
+    df = df.astype({strColumn: strType for strColumn, strType in dctCast.items() if strColumn in df.columns})
+    for strColumn, srWitnesses in dctDates.items():
+        if strColumn in df.columns:
+            df[strColumn] = pd.concat([df[strColumn], srWitnesses], ignore_index=True).astype(pd.StringDtype()).iloc[:len(df)].to_numpy()  # the witnesses set the format of the whole column
+    return df.astype(pd.StringDtype("pyarrow" if blnArrow else None)).fillna(".")
+
+
+def _iterSasChunks(strFilePath, intChunkRows, lstColumns=None, intRows=None):
+    '''
+    Read a SAS file `intChunkRows` rows at a time, keeping only `lstColumns` (pandas' SAS readers cannot skip columns while parsing, so each chunk is projected straight after it is read).
+    '''
+    intRemaining = intRows
+    with pd.read_sas(strFilePath, encoding="utf-8", chunksize=intChunkRows) as reader:
+        while intRemaining is None or intRemaining > 0:
+            intRead = intChunkRows if intRemaining is None else min(intChunkRows, intRemaining)
+            try:
+                df = reader.read(intRead)
+            except StopIteration:
+                break
+            if df is None or len(df) == 0:
+                break
+            if lstColumns is not None:
+                lstMissing = [strColumn for strColumn in lstColumns if strColumn not in df.columns]
+                if lstMissing:
+                    raise RuntimeError("***ERROR: columns not found in "+strFilePath+": "+", ".join(lstMissing)+"***")
+                df = df[list(lstColumns)]
+            if intRemaining is not None:
+                intRemaining -= len(df)
+            yield df
+
+
+def convertSasToCsv(strFilePath, strOutPath, intChunkRows=100000, lstColumns=None):
+    '''
+    Convert a SAS file to a CSV file (written the same way as `saveToCsv`) one chunk at a time, so memory use is bounded by `intChunkRows` whatever the size of the file.
+    The CSV file is written to a temporary file first and only replaces `strOutPath` once the conversion is complete.
+
+     Parameters
+     ----------
+     strFilePath : string (path to the SAS file; NOTE: this should be the absolute path to the file)
+     strOutPath : string (path to the CSV file to create)
+     intChunkRows : int (number of rows converted at a time; defaults to 100000)
+     lstColumns : list (only keep these columns, in this order; defaults to every column)
+
+     Return
+     ----------
+     int (number of rows written)
+    '''
+    strTmpPath = strOutPath + "." + uuid.uuid4().hex + ".tmp"
+    intRows = 0
+    try:
+        with open(strTmpPath, "w", encoding="utf-8", newline="") as f:
+            for df in readSasDatatableChunks(strFilePath, intChunkRows, lstColumns):
+                df.to_csv(f, index=False, quoting=1, header=intRows == 0)
+                intRows += len(df)
+        os.replace(strTmpPath, strOutPath)
+    finally:
+        if os.path.exists(strTmpPath):
+            os.remove(strTmpPath)
+    return intRows
+
+
+def convertSasToFeather(strFilePath, strOutPath, intChunkRows=100000, lstColumns=None):
+    '''
+    Convert a SAS file to a columnar Feather (Arrow IPC) file one chunk at a time, so memory use is bounded by `intChunkRows` whatever the size of the file.
+    Every column is stored as a string with missing values set to `.` (the same as `readSasDatatableChunks`), and the file can be read back with `pd.read_feather`. Requires pyarrow.
+
+     Parameters
+     ----------
+     strFilePath : string (path to the SAS file; NOTE: this should be the absolute path to the file)
+     strOutPath : string (path to the Feather file to create)
+     intChunkRows : int (number of rows converted at a time; defaults to 100000)
+     lstColumns : list (only keep these columns, in this order; defaults to every column)
+
+     Return
+     ----------
+     int (number of rows written)
+    '''
+    pa, _ = _importPyarrow()
+    strTmpPath = strOutPath + "." + uuid.uuid4().hex + ".tmp"
+    intRows = 0
+    objWriter = None
+    try:
+        for df in readSasDatatableChunks(strFilePath, intChunkRows, lstColumns, blnArrow=True):
+            objTable = pa.Table.from_pandas(df, preserve_index=False)
+            if objWriter is None:
+                objSchema = pa.schema([(strName, pa.string()) for strName in objTable.column_names])  # every chunk is all strings, so the schema is fixed by the first
+                objWriter = pa.ipc.new_file(strTmpPath, objSchema)
+            objWriter.write_table(objTable.cast(objSchema))
+            intRows += len(df)
+        if objWriter is None:
+            raise RuntimeError("***ERROR: no rows found in "+strFilePath+"***")
+        objWriter.close()
+        objWriter = None
+        os.replace(strTmpPath, strOutPath)
+    finally:
+        if objWriter is not None:
+            objWriter.close()
+        if os.path.exists(strTmpPath):
+            os.remove(strTmpPath)
+    return intRows
+
+
 def saveToCsv(strFilePath, df):
     '''
     Save a dataframe to a CSV file.
@@ -165,29 +578,23 @@ def saveToCsv(strFilePath, df):
     df.to_csv(strFilePath, encoding='utf-8', index=False, quoting=1)
 
 
-def getRowCount(strFilePath):
+def getRowCount(strFilePath, intWorkers=1):
     '''
     This method is useful for very large CSV files were we simply wish to know the row count.
+    The raw bytes are scanned by `countCsvRows` (quote aware) instead of parsing the file through pandas.
 
      Parameters
      ----------
      strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
+     intWorkers : int (number of threads used to scan the file; defaults to 1)
 
      Return
      ----------
      number of rows
     '''
-    df = readCsvStandard(strFilePath, None, False)
-    print("getting row count of (assuming the first line is a header)", len(df))
-    return len(df)
-
-    '''
-    The following works, but may report more rows than exist.
-    '''
-    # import subprocess
-    # num_lines = int(subprocess.check_output("wc -l "+strFilePath, shell=True).split()[0]) - 1
-    # print("getting row count of (assuming the first line is a header)", num_lines)
-    # return num_lines
+    intRows = countCsvRows(strFilePath, intWorkers)
+    print("getting row count of (assuming the first line is a header)", intRows)
+    return intRows
 
 
 def getValueCounts(df, strColumnName):
@@ -207,17 +614,51 @@ def getValueCounts(df, strColumnName):
 
 
 # @title Replace the categorical numeric data with the string categories in a dataframe
-def dfMapCategories(df):
-    '''
-    [incomplete] Need to create code to map categories/labels to int values.
-    
-    '''
-    return "need to create code to map categories"
-    # dictMetadata = self.getFileMetadata(strFileName)
-    # for colname in list(df.columns):  # for each data file variable/column
-    #     file_index = next((index for (index, obj) in enumerate(dictMetadata['variables']) if colname in obj['name']), "None") # we need to know the index of the variable within the dictMetadata object
-    #     if (file_index!="None" and dictMetadata['variables'][file_index]['value']['format']=='categorical'): # if a variable contains categorical values
-    #         jsonVL = json.dumps(dictMetadata['variables'][file_index]['value']['category'])  # convert the categories to json
-    #         intVL = json.loads(jsonVL, object_hook=self.keysToInt)  # replace string keys with integer so we can map the json
-    #         df[colname] = df[colname].map(intVL)  # map the categories to the columns
-    # return df
\ No newline at end of file
+def dfMapCategories(df, objFile):
+    '''
+    Replace the coded values of categorical variables with their labels, using the `value.category` map of each variable in the file metadata.
+    Each mapped column becomes a pandas Categorical, so every label is stored once rather than repeated in every row.
+    Values missing from a variable's category map (such as `.`) are kept as they are.
+
+     Parameters
+     ----------
+     df : dataframe (e.g. from `readCsvStandard`)
+     objFile : DatasetModel.File (metadata of the file the dataframe was read from)
+
+     Return
+     ----------
+     dataframe
+
+     Example
+     ----------
+     objFile = DatasetMetadata.model_validate(validJson(strMetadataFile, True)).files[0]
+     dfLabelled = dfMapCategories(readCsvStandard(strRawDataFile), objFile)
+    '''
+    dctVariables = {objVar.name: objVar for objVar in (objFile.variables or [])}
+    dctColumns = {}
+    for strColumn in df.columns:
+        objVar = dctVariables.get(strColumn)
+        if objVar is not None and objVar.value.format == "categorical" and objVar.value.category:
+            dctColumns[strColumn] = _mapCategoryColumn(df[strColumn], objVar.value.category)
+    return df.assign(**dctColumns)
+
+
+def _mapCategoryColumn(srColumn, dctCategory):
+    '''
+    Map one column to a Categorical of labels. The column is factorized once and only its unique values are looked up in the category map.
+    '''
+    arrCodes, arrUniques = pd.factorize(srColumn)
+    lstMapped = [dctCategory.get(_categoryKey(vUnique), vUnique) for vUnique in arrUniques]
+    lstCategories = list(dict.fromkeys([*dctCategory.values(), *lstMapped]))  # labels in metadata order followed by any unmapped values
+    arrUniqueCodes = pd.Index(lstCategories).get_indexer(lstMapped)
+    arrCodes = np.where(arrCodes < 0, -1, arrUniqueCodes[arrCodes]) if len(arrUniqueCodes) else arrCodes
+    return pd.Categorical.from_codes(arrCodes, categories=lstCategories)
+
+
+def _categoryKey(vValue):
+    '''
+    Category keys are strings in the metadata, so numeric values (e.g. from SAS files) are converted the same way `readCsvStandard` would write them.
+    '''
+    if isinstance(vValue, float) and vValue.is_integer():
+        return str(int(vValue))
+    return str(vValue)
@@ -0,0 +1,192 @@
+'''
+This module removes duplicate records from data files larger than memory. Rows are hash-partitioned on the key columns
+into spill files (every copy of a key lands in the same partition, in file order), each partition is deduplicated on
+its own in a pool of worker processes, and the kept rows are merged back into their original file order. The result is
+the same as `dropDfDupRecords` on the whole table.
+'''
+import os, pickle, shutil, tempfile, uuid
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from ._datatable import readCsvStandardChunks
+
+ROW_COLUMN = "__intRowNumber__"  # original position of each row, carried through the spill files
+
+
+def dropCsvDupRecords(vData, strOutPath, lstColumns, strKeepRecord='last', intPartitions=32, intChunkRows=100000, intWorkers=4, vSep=',', strTmpDir=None):
+    '''
+    Out-of-core version of `dropDfDupRecords`: remove duplicate records based on one or more columns from a file that does not fit in memory and write the kept rows to a CSV file
+    (written the same way as `saveToCsv`). The kept rows and their order are exactly those of `dropDfDupRecords(readCsvStandard(...), lstColumns, strKeepRecord)`.
+    Each partition (about 1/`intPartitions` of the file) must fit in the memory of one worker, so raise `intPartitions` for larger files.
+
+     Parameters
+     ----------
+     vData : string (path to the CSV file; NOTE: this should be the absolute path to the file) or an iterable of dataframes (e.g. from `readCsvStandardChunks` or `DfFilter.applyFile`)
+     strOutPath : string (path to the CSV file to create; it only replaces an existing file once the deduplication is complete)
+     lstColumns : list (list of columns to search for duplicates, e.g. the household or participant ID)
+     strKeepRecord : string (default to 'last'; also takes 'first' or False like the dataframe drop_duplicates function)
+     intPartitions : int (number of spill files the rows are hashed into; defaults to 32)
+     intChunkRows : int (number of rows read and written at a time; defaults to 100000)
+     intWorkers : int (number of processes deduplicating partitions at the same time; defaults to 4)
+     vSep : string (column delimiter when vData is a path; defaults to `,`)
+     strTmpDir : string (directory for the spill files; defaults to the system temporary directory)
+
+     Return
+     ----------
+     int (number of rows written)
+
+     Example
+     ----------
+     intRows = dropCsvDupRecords(strRawDataFile, strOutFile, ["hhid"], 'last')
+    '''
+    iterChunks = readCsvStandardChunks(vData, intChunkRows, vSep=vSep) if isinstance(vData, (str, os.PathLike)) else vData
+    strTmpPath = strOutPath + "." + uuid.uuid4().hex + ".tmp"
+    intRows = 0
+    try:
+        with open(strTmpPath, "w", encoding="utf-8", newline="") as f:
+            for df in dropDupRecordsChunks(iterChunks, lstColumns, strKeepRecord, intPartitions, intChunkRows, intWorkers, strTmpDir):
+                df.to_csv(f, index=False, quoting=1, header=f.tell() == 0)
+                intRows += len(df)
+        os.replace(strTmpPath, strOutPath)
+    finally:
+        if os.path.exists(strTmpPath):
+            os.remove(strTmpPath)
+    return intRows
+
+
+def dropDupRecordsChunks(iterChunks, lstColumns, strKeepRecord='last', intPartitions=32, intChunkRows=100000, intWorkers=4, strTmpDir=None):
+    '''
+    Streaming form of `dropCsvDupRecords`: take a chunked stream of dataframes and yield the kept rows, in their original order, as dataframes of about `intChunkRows` rows.
+    Every chunk is spilled to disk before the first kept row is yielded (a later duplicate can always replace an earlier row), and the spill files are removed once the stream is exhausted or closed.
+    At least one dataframe is yielded (an empty one with the columns of the stream when no rows are kept).
+    Keys are hashed and compared as strings, so the chunks must format the same value the same way in every chunk (as `readCsvStandardChunks` does).
+
+     Parameters
+     ----------
+     iterChunks : iterable of dataframes (e.g. from `readCsvStandardChunks` or `DfFilter.applyFile`)
+     lstColumns : list (list of columns to search for duplicates)
+     strKeepRecord : string (default to 'last'; also takes 'first' or False like the dataframe drop_duplicates function)
+     intPartitions : int (number of spill files the rows are hashed into; defaults to 32)
+     intChunkRows : int (number of rows in each dataframe yielded; defaults to 100000)
+     intWorkers : int (number of processes deduplicating partitions at the same time; defaults to 4)
+     strTmpDir : string (directory for the spill files; defaults to the system temporary directory)
+
+     Return
+     ----------
+     generator of dataframes
+    '''
+    if strKeepRecord not in ('first', 'last', False):
+        raise RuntimeError("***ERROR: strKeepRecord must be 'first', 'last' or False***")
+    strSpillDir = tempfile.mkdtemp(prefix="dedup", dir=strTmpDir)
+    try:
+        lstColumnNames, lstSpills = _partitionChunks(iterChunks, lstColumns, intPartitions, strSpillDir)
+        with ProcessPoolExecutor(max_workers=intWorkers) as executor:
+            intKeptRows = max(1000, intChunkRows // max(1, len(lstSpills)))  # the merge holds one chunk per partition, so together they are about `intChunkRows` rows
+            lstKept = list(executor.map(_dedupPartition, lstSpills, [lstColumns] * len(lstSpills), [strKeepRecord] * len(lstSpills), [intKeptRows] * len(lstSpills)))
+        blnEmpty = True
+        for df in _mergePartitions(lstKept, intChunkRows):
+            blnEmpty = False
+            yield df
+        if blnEmpty:
+            yield pd.DataFrame(columns=lstColumnNames)
+    finally:
+        shutil.rmtree(strSpillDir, ignore_errors=True)
+
+
+def _partitionChunks(iterChunks, lstColumns, intPartitions, strSpillDir):
+    '''
+    Append the rows of every chunk (tagged with their original row number) to the spill file of their key's hash partition.
+    Returns the column names and the paths of the spill files that received rows.
+    '''
+    lstColumnNames = None
+    dctFiles = {}
+    intOffset = 0
+    try:
+        for df in iterChunks:
+            if lstColumnNames is None:
+                lstColumnNames = list(df.columns)
+                lstMissing = [strColumn for strColumn in lstColumns if strColumn not in df.columns]
+                if lstMissing:
+                    raise RuntimeError("***ERROR: duplicate key columns not found: "+", ".join(lstMissing)+"***")
+            if len(df) == 0:
+                continue
+            df = df.reset_index(drop=True)
+            df[ROW_COLUMN] = np.arange(intOffset, intOffset + len(df), dtype=np.int64)
+            intOffset += len(df)
+            arrParts = (pd.util.hash_pandas_object(_keyStrings(df, lstColumns), index=False).to_numpy() % np.uint64(intPartitions)).astype(np.intp)
+            arrOrder = np.argsort(arrParts, kind="stable")  # keeps file order within each partition
+            arrBounds = np.searchsorted(arrParts[arrOrder], np.arange(intPartitions + 1))
+            for intPart in range(intPartitions):
+                if arrBounds[intPart] == arrBounds[intPart + 1]:
+                    continue
+                if intPart not in dctFiles:
+                    dctFiles[intPart] = open(os.path.join(strSpillDir, "part" + str(intPart) + ".pkl"), "wb")
+                pickle.dump(df.iloc[arrOrder[arrBounds[intPart]:arrBounds[intPart + 1]]], dctFiles[intPart], protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in dctFiles.values():
+            f.close()
+    return lstColumnNames or [], [os.path.join(strSpillDir, "part" + str(intPart) + ".pkl") for intPart in sorted(dctFiles)]
+
+
+def _dedupPartition(strSpillPath, lstColumns, strKeepRecord, intChunkRows):
+    '''
+    Deduplicate one spill file (runs in a worker process). The kept rows are already in file order and are written back in chunks of `intChunkRows` rows.
+    '''
+    df = pd.concat(list(_readPickles(strSpillPath)), ignore_index=True)
+    df = df[~_keyStrings(df, lstColumns).duplicated(keep=strKeepRecord).to_numpy()]
+    strKeptPath = strSpillPath + ".kept"
+    with open(strKeptPath, "wb") as f:
+        for intStart in range(0, len(df), intChunkRows):
+            pickle.dump(df.iloc[intStart:intStart + intChunkRows], f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.remove(strSpillPath)
+    return strKeptPath
+
+
+def _mergePartitions(lstKept, intChunkRows=100000):
+    '''
+    Merge the deduplicated partitions back into original row order and yield them about `intChunkRows` rows at a time. Only one chunk per partition is held at a time:
+    every buffered row numbered up to the smallest "last row" among the buffers can safely be yielded.
+    '''
+    lstReaders = [_readPickles(strPath) for strPath in lstKept]
+    lstBuffers = [next(iterReader, None) for iterReader in lstReaders]
+    lstReady = []
+    intReady = 0
+    while True:
+        lstActive = [i for i, df in enumerate(lstBuffers) if df is not None]
+        if lstActive:
+            intLimit = min(lstBuffers[i][ROW_COLUMN].iat[-1] for i in lstActive)
+            lstMerge = []
+            for i in lstActive:
+                intSplit = int(np.searchsorted(lstBuffers[i][ROW_COLUMN].to_numpy(), intLimit, side="right"))
+                if intSplit:
+                    lstMerge.append(lstBuffers[i].iloc[:intSplit])
+                    lstBuffers[i] = lstBuffers[i].iloc[intSplit:]
+                if len(lstBuffers[i]) == 0:
+                    lstBuffers[i] = next(lstReaders[i], None)
+            lstReady.append(pd.concat(lstMerge).sort_values(ROW_COLUMN, kind="stable"))
+            intReady += len(lstReady[-1])
+        if lstReady and (intReady >= intChunkRows or not lstActive):
+            yield pd.concat(lstReady).drop(columns=ROW_COLUMN).reset_index(drop=True)
+            lstReady = []
+            intReady = 0
+        if not lstActive:
+            break
+
+
+def _keyStrings(df, lstColumns):
+    '''
+    The key columns as strings, so a key hashes and compares the same whatever the dtype of the chunk it came from.
+    '''
+    return df[lstColumns].astype(pd.StringDtype())
+
+
+def _readPickles(strPath):
+    '''
+    Yield the dataframes appended to a spill file one after another.
+    '''
+    with open(strPath, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
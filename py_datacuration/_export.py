@@ -1,17 +1,20 @@
-import ipynbname, nbconvert, os, subprocess, sys, time
+import os, subprocess, time
 
-# Construct the path to the jupyter executable in the virtual environment
-venv_path = os.environ.get('VIRTUAL_ENV')
-if venv_path:
-    jupyter_path = os.path.join(venv_path, 'bin', 'jupyter')
-else:
-    raise RuntimeError("***ERROR: VIRTUAL_ENV environment variable not set.")
 
-# Construct the nbconvert command
-if not jupyter_path:
-    raise RuntimeError("***ERROR: Could not construct jupyter_path")
+def getJupyterPath():
+    """
+    Construct the path to the jupyter executable in the virtual environment (resolved when an export runs rather than at import time).
+
+     Returns
+     ----------
+     String
+    """
+    venv_path = os.environ.get('VIRTUAL_ENV')
+    if not venv_path:
+        raise RuntimeError("***ERROR: VIRTUAL_ENV environment variable not set.")
+    return os.path.join(venv_path, 'bin', 'jupyter')
+
 
-    
 def exportNotebookToReadme(strExportFilePathNoEx):
     """
     Generates a README.md file for a given input Notebook file.
@@ -23,6 +26,8 @@ def exportNotebookToReadme(strExportFilePathNoEx):
      ----------
      strExportFilePathNoEx : string (Path to the final output file WITHOUT file extension since a `.md` extension is added by the export method))
     """
+    import ipynbname  # imported here so importing this module stays free of notebook dependencies
+    jupyter_path = getJupyterPath()
     strNotebookFileInput=ipynbname.name()+".ipynb"
     subprocess.run([jupyter_path, "nbconvert", strNotebookFileInput, "--to", "markdown", "--no-input", "--output", strExportFilePathNoEx], check=True)
     # adding the `--no-input` will exclude the python code blocks from the output
@@ -1,9 +1,10 @@
-import hashlib, os
+import errno, hashlib, os
+from concurrent.futures import ThreadPoolExecutor
 
 '''
 This module contains file related functions.
 '''
-def findFile(filename, root_dir):
+def findFile(filename, root_dir, objIndex=None):
     """
     For a given file and root directory, find the subdirectory where the file lives.
 
@@ -11,6 +12,7 @@ def findFile(filename, root_dir):
      ----------
      filename : str "name of file to search"
      root_dir : str "The directory to locate the file within."
+     objIndex : DirectoryIndex "Optional index of root_dir (or of a directory above it); the lookup is then done in memory instead of walking the tree."
 
      Returns
      ----------
@@ -20,19 +22,22 @@ def findFile(filename, root_dir):
      ----------
      fileExists = find_file(strRawDataFile, strDatasetPath)
     """
+    if objIndex is not None:
+        return objIndex.findFile(filename, root_dir)
     for dirpath, dirnames, filenames in os.walk(root_dir):
         if filename in filenames:
             return dirpath
     return False
 
 
-def listDirContents(root_dir):
+def listDirContents(root_dir, objIndex=None):
     """
     For a given directory, return a list of all contents (files and directories), not subdirectories.
 
      Parameters
      ----------
      root_dir : str "The directory to search."
+     objIndex : DirectoryIndex "Optional index containing root_dir; the contents are then read from memory."
 
      Returns
      ----------
@@ -42,6 +47,8 @@ def listDirContents(root_dir):
      ----------
      objDsMetadataTemp[strDataset]={"lstColumns":[*dfTableData], "files":listFiles(.strDatasetPath+"/"+strDataset), "tableName": objTable["TABLE_NAME"]}
     """
+    if objIndex is not None:
+        return objIndex.listDirContents(root_dir)
     return os.listdir(root_dir)
 
 
@@ -61,22 +68,184 @@ def isDirectory(strPath):
     return os.path.isdir(strPath)
 
 
-def isFile(strPath):
+def isFile(strPath, objIndex=None):
     """
     Simply checks if a path is a file.
 
      Parameters
      ----------
      strPath : str "The path to search."
+     objIndex : DirectoryIndex "Optional index containing the path; the check is then done in memory."
 
      Returns
      ----------
      Boolean
      
     """
+    if objIndex is not None:
+        return objIndex.isFile(strPath)
     return os.path.isfile(strPath)
 
 
+class DirectoryIndex():
+    def __init__(self, root_dir):
+        """
+        Scan a directory tree once (with `os.scandir`) and keep an in-memory map of file names to the directories that contain them, so repeated lookups do not walk the tree again.
+        Call `refresh` to pick up changes; only directories whose modification time changed are scanned again.
+
+         Parameters
+         ----------
+         root_dir : str "The directory to index (including subdirectories)."
+
+         Example
+         ----------
+         objIndex = DirectoryIndex(strDatasetPath)
+         strDir = findFile(strRawDataFile, strDatasetPath, objIndex)
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self.dctDirs = {}  # absolute directory path -> (modification time, list of file names, list of subdirectory paths, list of names of symlinks to directories)
+        self.dctNames = {}  # file name -> list of absolute directory paths holding a file with that name
+        self._scanTree(self.root_dir)
+
+
+    def findFile(self, filename, root_dir=None):
+        """
+        Return the first directory containing the file name, or False (the same as `findFile`).
+        With `root_dir` only that part of the tree is searched and the directory is returned the way `os.walk(root_dir)` builds it; otherwise the absolute path is returned.
+        """
+        lstDirs = self.findAll(filename, root_dir)
+        return lstDirs[0] if lstDirs else False
+
+
+    def findAll(self, filename, root_dir=None):
+        """
+        Return every directory containing the file name (duplicates included), limited to `root_dir` like `findFile`.
+        """
+        lstDirs = self.dctNames.get(filename, [])
+        if root_dir is None:
+            return list(lstDirs)
+        strRoot = os.path.abspath(root_dir)
+        if strRoot != self.root_dir and not strRoot.startswith(self.root_dir.rstrip(os.sep) + os.sep):
+            raise RuntimeError("***ERROR: "+root_dir+" is not inside the indexed directory "+self.root_dir+"***")
+        return [root_dir if strDir == strRoot else os.path.join(root_dir, os.path.relpath(strDir, strRoot)) for strDir in lstDirs
+                if strDir == strRoot or strDir.startswith(strRoot.rstrip(os.sep) + os.sep)]
+
+
+    def isFile(self, strPath):
+        """
+        Whether the path is an indexed file.
+        """
+        strDir, strName = os.path.split(os.path.abspath(strPath))
+        return strDir in self.dctNames.get(strName, [])
+
+
+    def isDirectory(self, strPath):
+        """
+        Whether the path is an indexed directory (or a symlink to a directory listed in one).
+        """
+        strPath = os.path.abspath(strPath)
+        strParent, strName = os.path.split(strPath)
+        return strPath in self.dctDirs or (strParent in self.dctDirs and strName in self.dctDirs[strParent][3])
+
+
+    def listDirContents(self, root_dir):
+        """
+        Return the file and subdirectory names of an indexed directory (the same as `listDirContents`, which also raises `FileNotFoundError` for a directory it does not know).
+        """
+        strDir = os.path.abspath(root_dir)
+        if strDir not in self.dctDirs:
+            raise FileNotFoundError(errno.ENOENT, "Directory not found in the index", root_dir)
+        intMtime, lstFiles, lstSubdirs, lstLinks = self.dctDirs[strDir]
+        return lstFiles + [os.path.basename(strSubdir) for strSubdir in lstSubdirs] + lstLinks
+
+
+    def refresh(self):
+        """
+        Rescan only the directories whose modification time changed since they were indexed (a directory's time changes when entries are added, removed or renamed).
+
+         Returns
+         ----------
+         Number of directories rescanned
+        """
+        intRescanned = 0
+        for strDir in list(self.dctDirs):
+            if strDir not in self.dctDirs:  # removed while refreshing its parent
+                continue
+            try:
+                intMtime = os.stat(strDir).st_mtime_ns
+            except FileNotFoundError:
+                self._dropTree(strDir)
+                intRescanned += 1
+                continue
+            if intMtime != self.dctDirs[strDir][0]:
+                lstOldSubdirs = self.dctDirs[strDir][2]
+                self._dropDir(strDir)
+                lstNewSubdirs = self._scanDir(strDir)
+                for strSubdir in lstOldSubdirs:
+                    if strSubdir not in lstNewSubdirs:
+                        self._dropTree(strSubdir)
+                for strSubdir in lstNewSubdirs:
+                    if strSubdir not in self.dctDirs:
+                        self._scanTree(strSubdir)
+                intRescanned += 1
+        return intRescanned
+
+
+    def _scanTree(self, strDir):
+        """
+        Index a directory and everything below it.
+        """
+        lstStack = [strDir]
+        while lstStack:
+            lstStack.extend(reversed(self._scanDir(lstStack.pop())))  # depth first in directory order, like `os.walk`
+
+
+    def _scanDir(self, strDir):
+        """
+        Index the entries of one directory and return its subdirectory paths.
+        Symlinks to directories are listed but not followed (like `os.walk`), so a link back up the tree cannot make the scan loop.
+        """
+        lstFiles, lstSubdirs, lstLinks = [], [], []
+        try:
+            intMtime = os.stat(strDir).st_mtime_ns
+            with os.scandir(strDir) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        lstSubdirs.append(os.path.join(strDir, entry.name))
+                    elif entry.is_symlink() and entry.is_dir():
+                        lstLinks.append(entry.name)
+                    else:
+                        lstFiles.append(entry.name)
+        except (FileNotFoundError, PermissionError, NotADirectoryError):  # `os.walk` skips unreadable directories too
+            return []
+        self.dctDirs[strDir] = (intMtime, lstFiles, lstSubdirs, lstLinks)
+        for strName in lstFiles:
+            self.dctNames.setdefault(strName, []).append(strDir)
+        return lstSubdirs
+
+
+    def _dropDir(self, strDir):
+        """
+        Remove one directory (not its subdirectories) from the index.
+        """
+        intMtime, lstFiles, lstSubdirs, lstLinks = self.dctDirs.pop(strDir)
+        for strName in lstFiles:
+            lstDirs = self.dctNames[strName]
+            lstDirs.remove(strDir)
+            if not lstDirs:
+                del self.dctNames[strName]
+
+
+    def _dropTree(self, strDir):
+        """
+        Remove a directory and everything below it from the index.
+        """
+        if strDir in self.dctDirs:
+            for strSubdir in self.dctDirs[strDir][2]:
+                self._dropTree(strSubdir)
+            self._dropDir(strDir)
+
+
 def getModuleFuncsFromPath(strDir, strPackage, lstFileExclude=[]):
     """
     For a given directory, return a list of all Python functions and the files that contain them.
@@ -139,11 +308,7 @@ def getSha2Hash(strFilePath):
      ----------
      SHA2 hash
     """
-    hash = hashlib.sha256()
-    with open(strFilePath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash.update(chunk)
-    return hash.hexdigest()
+    return getFileHashes(strFilePath, ["sha256"])["sha256"]
 
 
 def getMd5Hash(strFilePath):
@@ -159,8 +324,57 @@ def getMd5Hash(strFilePath):
      MD5 hash
      
     """
-    hash_md5 = hashlib.md5()
-    with open(strFilePath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
\ No newline at end of file
+    return getFileHashes(strFilePath, ["md5"])["md5"]
+
+
+def getFileHashes(strFilePath, lstAlgorithms=["md5", "sha256"], intBufferSize=1024 * 1024):
+    """
+    Generates several hashes for a given file while reading the file only once.
+
+     Parameters
+     ----------
+     strFilePath : str "The file path."
+     lstAlgorithms : list "Names of the hashlib algorithms to compute; defaults to md5 and sha256."
+     intBufferSize : int "Number of bytes read at a time; defaults to 1 MB."
+
+     Returns
+     ----------
+     Dict of algorithm name to hex digest
+
+     Example
+     ----------
+     dctHashes = getFileHashes(strRawDataFile)
+     objFile.md5Hash = dctHashes["md5"]
+    """
+    lstHashes = [hashlib.new(strAlgorithm) for strAlgorithm in lstAlgorithms]
+    buffer = bytearray(intBufferSize)
+    view = memoryview(buffer)
+    with open(strFilePath, "rb", buffering=0) as f:
+        while intRead := f.readinto(buffer):
+            for objHash in lstHashes:
+                objHash.update(view[:intRead])  # hashlib releases the GIL for large updates so other threads keep hashing
+    return {strAlgorithm: objHash.hexdigest() for strAlgorithm, objHash in zip(lstAlgorithms, lstHashes)}
+
+
+def getBatchHashes(vFiles, lstAlgorithms=["md5", "sha256"], intWorkers=8):
+    """
+    Generates hashes for many files at once on a thread pool (each file is read once for all of the algorithms).
+
+     Parameters
+     ----------
+     vFiles : list or str "A list of file paths, or a directory whose files (including subdirectories) are hashed."
+     lstAlgorithms : list "Names of the hashlib algorithms to compute; defaults to md5 and sha256."
+     intWorkers : int "Number of files hashed at the same time; defaults to 8."
+
+     Returns
+     ----------
+     Dict of file path to a dict of algorithm name to hex digest
+
+     Example
+     ----------
+     dctHashes = getBatchHashes(strDatasetPath, ["md5"])
+    """
+    if isinstance(vFiles, str):
+        vFiles = [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(vFiles) for filename in filenames]
+    with ThreadPoolExecutor(max_workers=intWorkers) as executor:
+        return dict(zip(vFiles, executor.map(lambda strFilePath: getFileHashes(strFilePath, lstAlgorithms), vFiles)))
\ No newline at end of file
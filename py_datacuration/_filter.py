@@ -0,0 +1,158 @@
+'''
+This module contains a composable filter for data tables. The predicates of the `_datatable` filter helpers
+(`subsetDfByList`, `filterByDfColNotNa`, `filterByDfColEqTo` and `filterByDfColContains`) are recorded first and then
+combined into a single boolean mask, so the filtered table is only materialized once instead of once per predicate.
+The same filter can be applied to a chunked stream of a file.
+'''
+import numpy as np
+from ._datatable import dfColContains, readCsvStandardChunks
+
+
+class DfFilter():
+    def __init__(self):
+        """
+        Create an empty filter. Add predicates with the chainable methods below; a row is kept when it matches every predicate.
+        Missing values never match (they do not raise an error).
+
+         Example
+         ----------
+         objFilter = DfFilter().isIn("hhid", lstHouseholds).notNa("age").eqTo("wave", "3")
+         dfSubset = objFilter.apply(df)
+         for dfChunk in objFilter.applyFile(strRawDataFile):
+            saveToCsv(strOutFile, dfChunk)
+        """
+        self.lstPredicates = []
+
+
+    def isIn(self, strColumn, lstValues):
+        """
+        Keep rows where the column value is in a list of values (like `subsetDfByList`).
+        """
+        self.lstPredicates.append(("isIn", strColumn, (list(lstValues),)))
+        return self
+
+
+    def notNa(self, strColumn):
+        """
+        Keep rows where the column value is not missing (like `filterByDfColNotNa`).
+        """
+        self.lstPredicates.append(("notNa", strColumn, ()))
+        return self
+
+
+    def eqTo(self, strColumn, strValue):
+        """
+        Keep rows where the column is equal to a value (like `filterByDfColEqTo`).
+        """
+        self.lstPredicates.append(("eqTo", strColumn, (strValue,)))
+        return self
+
+
+    def contains(self, strColumn, strValue, blnCase=True, blnRegex=True):
+        """
+        Keep rows where the column contains a value, or any of a list of terms (like `filterByDfColContains`).
+        """
+        self.lstPredicates.append(("contains", strColumn, (strValue, blnCase, blnRegex)))
+        return self
+
+
+    def getColumns(self):
+        """
+        List the columns the filter reads.
+
+         Returns
+         ----------
+         List of column names
+        """
+        return list(dict.fromkeys(strColumn for strName, strColumn, tplArgs in self.lstPredicates))
+
+
+    def getMask(self, df):
+        """
+        Combine every predicate into one boolean mask. Each predicate after the first is only evaluated on the rows that are still selected.
+
+         Parameters
+         ----------
+         df : dataframe
+
+         Returns
+         ----------
+         numpy boolean array (one entry per row)
+        """
+        arrMask = np.ones(len(df), dtype=bool)
+        for strName, strColumn, tplArgs in self.lstPredicates:
+            arrRows = np.flatnonzero(arrMask)
+            if len(arrRows) == 0:
+                break
+            srColumn = df[strColumn]
+            if len(arrRows) < len(df):
+                srColumn = srColumn.iloc[arrRows]
+            arrMask[arrRows] = _evaluate(strName, srColumn, tplArgs)
+        return arrMask
+
+
+    def apply(self, df):
+        """
+        Return the rows of a dataframe that match every predicate (a single copy of the table is made).
+
+         Parameters
+         ----------
+         df : dataframe
+
+         Returns
+         ----------
+         dataframe
+        """
+        if not self.lstPredicates:
+            return df
+        return df[self.getMask(df)]
+
+
+    def applyChunks(self, iterChunks):
+        """
+        Apply the filter to each dataframe of a chunked stream.
+
+         Parameters
+         ----------
+         iterChunks : iterable of dataframes (e.g. from `readCsvStandardChunks`)
+
+         Returns
+         ----------
+         generator of dataframes
+        """
+        for dfChunk in iterChunks:
+            yield self.apply(dfChunk)
+
+
+    def applyFile(self, strFilePath, intChunkRows=100000, vSep=','):
+        """
+        Stream a CSV file through `readCsvStandardChunks` and yield the matching rows of each chunk, so files larger than memory can be filtered.
+
+         Parameters
+         ----------
+         strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
+         intChunkRows : int (number of rows read at a time; defaults to 100000)
+         vSep : string (column delimiter; defaults to `,`)
+
+         Returns
+         ----------
+         generator of dataframes
+        """
+        return self.applyChunks(readCsvStandardChunks(strFilePath, intChunkRows, vSep=vSep))
+
+
+def _evaluate(strName, srColumn, tplArgs):
+    '''
+    Evaluate one predicate on a column and return a numpy boolean array where missing values are False.
+    '''
+    if strName == "isIn":
+        srResult = srColumn.isin(tplArgs[0])
+    elif strName == "notNa":
+        srResult = srColumn.notna()
+    elif strName == "eqTo":
+        srResult = srColumn == tplArgs[0]
+    elif strName == "contains":
+        srResult = dfColContains(srColumn, tplArgs[0], tplArgs[1], tplArgs[2], True)
+    else:
+        raise RuntimeError("***ERROR: unknown filter predicate "+strName+"***")
+    return srResult.to_numpy(dtype=bool, na_value=False)
@@ -1,8 +1,10 @@
 '''
 This module contains functions that pertain to working with JSON files and data.
 '''
-import json
+import functools, itertools, json, os, re, sys, uuid
 import numpy as np
+import pydantic_core
+from concurrent.futures import ThreadPoolExecutor
 
 def validJson(strFilePath, blnReturn=False):
     '''
@@ -21,19 +23,62 @@ def validJson(strFilePath, blnReturn=False):
      ----------
      self._config = validJson("strPathTo/something.json", True)
     '''
-    f = open(strFilePath, "r")
+    with open(strFilePath, "r") as f:  # the file is closed even when the JSON is invalid
+        try:
+            objJson = json.loads(f.read()) # put JSON-data to a variable
+        except json.decoder.JSONDecodeError:
+            raise RuntimeError("***ERROR: Invalid JSON for "+strFilePath+"***")
+    if blnReturn:
+        return objJson
+
+
+def validJsonBatch(vFiles, intWorkers=8):
+    '''
+    Check many JSON files at once (e.g. every metadata sidecar of a deposit). Files are read as bytes and parsed with the Rust-backed
+    `pydantic_core.from_json` parser on a thread pool, and every failure is reported with its position instead of stopping at the first one.
+
+     Parameters
+     ----------
+     vFiles : list or string (list of file paths, or a directory whose `.json` files, including subdirectories, are checked)
+     intWorkers : int (number of files checked at the same time; defaults to 8)
+
+     Returns
+     ----------
+     List of failures, each a dict with `strFilePath`, `strError`, `intLine` and `intColumn` (an empty list means every file is valid)
+
+     Example
+     ----------
+     for dctFailure in validJsonBatch(strDatasetPath):
+        print(dctFailure["strFilePath"], "line", dctFailure["intLine"], dctFailure["strError"])
+    '''
+    if isinstance(vFiles, str):
+        vFiles = [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(vFiles) for filename in filenames if filename.lower().endswith(".json")]
+    with ThreadPoolExecutor(max_workers=intWorkers) as executor:
+        return [dctFailure for dctFailure in executor.map(_checkJsonFile, vFiles) if dctFailure is not None]
+
+
+def _checkJsonFile(strFilePath):
+    '''
+    Parse one file and return its failure (or None if it is valid JSON).
+    '''
     try:
-        objJson = json.loads(f.read()) # put JSON-data to a variable
-        f.close()
-        if blnReturn:
-            return objJson
-    except json.decoder.JSONDecodeError:
-        raise RuntimeError("***ERROR: Invalid JSON for "+strFilePath+"***")
+        with open(strFilePath, "rb") as f:
+            pydantic_core.from_json(f.read())
+        return None
+    except (ValueError, OSError) as e:
+        objMatch = re.search(r"at line (\d+) column (\d+)", str(e))
+        return {
+            "strFilePath": strFilePath,
+            "strError": str(e),
+            "intLine": int(objMatch.group(1)) if objMatch else None,
+            "intColumn": int(objMatch.group(2)) if objMatch else None,
+        }
 
 
 def getNestedElement(data, strKeys):
     '''
     This searches a data object (JSON) for nested properties based on a simple `dot-separated` string that can be dynamically generated and allows for accessing properties dynamically.
+    The path is compiled once and cached (see `compileNestedPath`), so numbers select list items and `*` matches every item, e.g. 'files.*.variables.*.name'.
     
      Parameters
      ----------
@@ -42,24 +87,97 @@ def getNestedElement(data, strKeys):
 
      Returns
      ----------
-     Dict
+     Dict (or a list of every match when the path contains `*`)
      
      Example
      ----------
      lstNotebook["desc"].append(getNestedElement(objNotebook,"metadata._cc__AboutThisNotebook_"))
     '''
+    if not isinstance(strKeys, str):
+        strKeys = tuple(strKeys)  # a list of keys (which may themselves contain `.`) is used as is
+    return compileNestedPath(strKeys)(data)
+
+
+@functools.lru_cache(maxsize=1024)
+def compileNestedPath(strKeys):
+    '''
+    Compile a `dot-separated` path into a reusable accessor function. Compiled paths are cached so the path is only split and parsed once.
+    A number selects a list item (and is still used as a key for dicts) and `*` matches every item of a list or every value of a dict.
+    Paths without `*` return the value or None if it is missing; paths with `*` return a flat list of every value found.
+
+     Parameters
+     ----------
+     strKeys : string or tuple (format like 'a.b.c', 'files.0.strFileName' or 'files.*.variables.*.name', or a tuple of the keys)
+
+     Returns
+     ----------
+     Function that takes a data object (JSON)
+
+     Example
+     ----------
+     funcVarNames = compileNestedPath("files.*.variables.*.name")
+     lstNames = [funcVarNames(objMetadata) for objMetadata in lstMetadata]
+    '''
     if isinstance(strKeys, str):
         strKeys = strKeys.split('.')
-    temp = data
-    for key in strKeys:
+    tplSteps = tuple((strKey, int(strKey) if isinstance(strKey, str) and strKey.lstrip('-').isdigit() else None) for strKey in strKeys)
+    if any(strKey == '*' for strKey, intIndex in tplSteps):
+        return lambda data: list(_iterNestedPath(data, tplSteps, 0))
+
+    def getPath(data):
+        for strKey, intIndex in tplSteps:
+            try:
+                data = data[intIndex] if intIndex is not None and isinstance(data, (list, tuple)) else data[strKey]
+            except (TypeError, KeyError, IndexError):
+                return None
+        return data
+    return getPath
+
+
+def _iterNestedPath(data, tplSteps, intStep):
+    '''
+    Yield every value a wildcard path reaches from `data`, starting at step `intStep`.
+    '''
+    for i in range(intStep, len(tplSteps)):
+        strKey, intIndex = tplSteps[i]
+        if strKey == '*':
+            if isinstance(data, dict):
+                lstItems = data.values()
+            elif isinstance(data, (list, tuple)):
+                lstItems = data
+            else:
+                return
+            for item in lstItems:
+                yield from _iterNestedPath(item, tplSteps, i + 1)
+            return
         try:
-            temp = temp[key]
-        except (TypeError, KeyError):
-            return None
-    return temp
+            data = data[intIndex] if intIndex is not None and isinstance(data, (list, tuple)) else data[strKey]
+        except (TypeError, KeyError, IndexError):
+            return
+    yield data
+
+
+def getNestedElements(lstData, lstPaths):
+    '''
+    Apply many paths to many data objects (JSON) at once. Results are returned in columns (one list per path, one entry per data object), which load straight into a dataframe.
+
+     Parameters
+     ----------
+     lstData : list (data objects/dicts, e.g. notebooks or metadata documents)
+     lstPaths : list (paths in the `getNestedElement` format)
+
+     Returns
+     ----------
+     Dict of path to a list of values
+
+     Example
+     ----------
+     dfNotebooks = pd.DataFrame(getNestedElements(lstNotebooks, ["metadata._cc__AboutThisNotebook_", "metadata.kernelspec.name"]))
+    '''
+    lstAccessors = [compileNestedPath(strPath) for strPath in lstPaths]
+    return {strPath: [funcAccessor(data) for data in lstData] for strPath, funcAccessor in zip(lstPaths, lstAccessors)}
 
 
-    
 # def setNestedElement(dic, keys, value, create_missing=True):
 #     '''
 #     This sets a data object element. Takes keys in a format like 'a.b.c' to more easily set nested dict/object properties dynamically.
@@ -103,6 +221,8 @@ def convertDictKeysToInt(input_dict):
 def saveJson(obj, strFileOutPath):
     '''
     Save JSON object to a file (with auto formatting applied).
+    The document is encoded straight to the file (see `writeJson`) rather than built as one string first, and it is written to a temporary file
+    that replaces `strFileOutPath` only once complete, so a failed save never leaves a truncated JSON file behind.
     
      Parameters
      ----------
@@ -112,13 +232,41 @@ def saveJson(obj, strFileOutPath):
      ----------
      saveJson(objMetadata, os.path.join(self._config["_cc__strOutputPath"],"gen."+self._config["metaDataFilename"]))
     '''
-    with open(strFileOutPath, mode='w') as jsonFile:
-        jsonFile.write(json.dumps(obj, indent=2, allow_nan=False, cls=NpEncoder))
+    strTmpPath = strFileOutPath + "." + uuid.uuid4().hex + ".tmp"
+    try:
+        with open(strTmpPath, mode='w', buffering=1024 * 1024) as jsonFile:
+            writeJson(obj, jsonFile)
+        os.replace(strTmpPath, strFileOutPath)  # atomic on the same file system
+    except BaseException:
+        if os.path.exists(strTmpPath):
+            os.remove(strTmpPath)
+        raise
+
+
+def writeJson(obj, jsonFile, intIndent=2):
+    '''
+    Encode a JSON object piece by piece to an open text file handle, so memory use does not grow with the size of the document.
+    
+     Parameters
+     ----------
+     obj : object/dict (JSON object, which may contain numpy and pandas values)
+     jsonFile : file handle (opened for writing text)
+     intIndent : int (number of spaces to indent; defaults to 2)
+
+     Example
+     ----------
+     with open("gen.metadata.json", mode='w') as jsonFile:
+        writeJson(objMetadata, jsonFile)
+    '''
+    iterChunks = NpEncoder(indent=intIndent, allow_nan=False).iterencode(obj)
+    while lstChunks := list(itertools.islice(iterChunks, 8192)):  # the encoder yields many tiny strings so we write them in batches
+        jsonFile.write("".join(lstChunks))
 
 
 class NpEncoder(json.JSONEncoder):
     '''
     This is important for correcting data to be converted to clean JSON using `json.dumps`. This is a callback object.
+    Handles numpy scalars and arrays as well as pandas values (Series, Index, Timestamp and missing values).
     
      Example
      ----------
@@ -126,10 +274,16 @@ class NpEncoder(json.JSONEncoder):
             jsonFile.write(json.dumps(jsonDeref, indent=2, allow_nan=False, cls=NpEncoder))
     '''
     def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
+        if isinstance(obj, np.generic):  # numpy integer, floating and bool scalars
+            return obj.item()
         if isinstance(obj, np.ndarray):
             return obj.tolist()
-        return super(NpEncoder, self).default(obj)
\ No newline at end of file
+        pd = sys.modules.get("pandas")  # a pandas value can only exist if pandas has been imported, so we never import it here
+        if pd is not None:
+            if obj is pd.NA or obj is pd.NaT:
+                return None
+            if isinstance(obj, pd.Timestamp):
+                return obj.isoformat()
+            if isinstance(obj, (pd.Series, pd.Index, pd.api.extensions.ExtensionArray)):
+                return obj.tolist()
+        return super(NpEncoder, self).default(obj)
@@ -0,0 +1,139 @@
+'''
+This module keeps a persistent manifest of file hashes in a local SQLite database. Files are identified by path, size and
+modification time, so only new or changed files are hashed again, and duplicate content is found through an index on the
+SHA-256 hash instead of comparing every pair of files.
+'''
+import os, sqlite3
+from ._file import getBatchHashes
+
+LST_ALGORITHMS = ["md5", "sha256"]
+
+
+class HashManifest():
+    def __init__(self, strDbPath):
+        """
+        Open (or create) the hash manifest database.
+
+         Parameters
+         ----------
+         strDbPath : str "Path to the SQLite database file holding the manifest."
+
+         Example
+         ----------
+         objManifest = HashManifest(os.path.join(strDatasetPath, ".hashes.sqlite"))
+         dctHashes = objManifest.updateTree(strDatasetPath)
+        """
+        self.objDb = sqlite3.connect(strDbPath)
+        self.objDb.execute("PRAGMA journal_mode=WAL")  # readers in other processes are not blocked while we write
+        self.objDb.execute("""CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            md5Hash TEXT NOT NULL,
+            sha256Hash TEXT NOT NULL
+        )""")
+        self.objDb.execute("CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files (sha256Hash)")
+        self.objDb.commit()
+
+
+    def getHashes(self, lstFilePaths, intWorkers=8):
+        """
+        Return the MD5 and SHA-256 hashes of files, reusing the stored hashes of files whose size and modification time have not changed.
+
+         Parameters
+         ----------
+         lstFilePaths : list "Paths of the files to hash."
+         intWorkers : int "Number of files hashed at the same time; defaults to 8."
+
+         Returns
+         ----------
+         Dict of absolute file path to {"md5Hash": ..., "sha256Hash": ...}
+        """
+        dctReturn = {}
+        dctStale = {}
+        for strFilePath in lstFilePaths:
+            strFilePath = os.path.abspath(strFilePath)
+            objStat = os.stat(strFilePath)
+            row = self.objDb.execute("SELECT size, mtime_ns, md5Hash, sha256Hash FROM files WHERE path = ?", (strFilePath,)).fetchone()
+            if row and row[0] == objStat.st_size and row[1] == objStat.st_mtime_ns:
+                dctReturn[strFilePath] = {"md5Hash": row[2], "sha256Hash": row[3]}
+            else:
+                dctStale[strFilePath] = objStat
+        if dctStale:
+            dctHashes = getBatchHashes(list(dctStale), LST_ALGORITHMS, intWorkers)
+            with self.objDb:  # one transaction for the whole batch
+                for strFilePath, dctHash in dctHashes.items():
+                    objStat = dctStale[strFilePath]
+                    self.objDb.execute(
+                        "INSERT OR REPLACE INTO files (path, size, mtime_ns, md5Hash, sha256Hash) VALUES (?, ?, ?, ?, ?)",
+                        (strFilePath, objStat.st_size, objStat.st_mtime_ns, dctHash["md5"], dctHash["sha256"]),
+                    )
+                    dctReturn[strFilePath] = {"md5Hash": dctHash["md5"], "sha256Hash": dctHash["sha256"]}
+        return dctReturn
+
+
+    def updateTree(self, strRootDir, intWorkers=8):
+        """
+        Bring the manifest up to date for every file under a directory: new and changed files are hashed and files that no longer exist are removed.
+
+         Parameters
+         ----------
+         strRootDir : str "The directory to scan (including subdirectories)."
+         intWorkers : int "Number of files hashed at the same time; defaults to 8."
+
+         Returns
+         ----------
+         Dict of absolute file path to {"md5Hash": ..., "sha256Hash": ...}
+        """
+        strRootDir = os.path.abspath(strRootDir)
+        lstFilePaths = [os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(strRootDir) for filename in filenames]
+        dctReturn = self.getHashes(lstFilePaths, intWorkers)
+        with self.objDb:
+            for (strFilePath,) in self.objDb.execute("SELECT path FROM files WHERE path >= ? AND path < ?", _pathRange(strRootDir)).fetchall():
+                if strFilePath not in dctReturn:
+                    self.objDb.execute("DELETE FROM files WHERE path = ?", (strFilePath,))
+        return dctReturn
+
+
+    def findDuplicates(self, strRootDir=None):
+        """
+        List groups of files in the manifest that share the same content.
+
+         Parameters
+         ----------
+         strRootDir : str "Only consider files under this directory; defaults to every file in the manifest."
+
+         Returns
+         ----------
+         Dict of SHA-256 hash to a list of file paths (only hashes shared by more than one file)
+
+         Example
+         ----------
+         for strHash, lstPaths in objManifest.findDuplicates(strDatasetPath).items():
+            print("duplicate content:", lstPaths)
+        """
+        strWhere, tplArgs = "", ()
+        if strRootDir is not None:
+            strWhere, tplArgs = "WHERE path >= ? AND path < ?", _pathRange(os.path.abspath(strRootDir))
+        dctReturn = {}
+        for strHash, strFilePath in self.objDb.execute(f"""SELECT sha256Hash, path FROM files WHERE sha256Hash IN (
+                SELECT sha256Hash FROM files {strWhere} GROUP BY sha256Hash HAVING COUNT(*) > 1
+            ) {"AND " + strWhere[6:] if strWhere else ""} ORDER BY sha256Hash, path""", tplArgs * 2):
+            dctReturn.setdefault(strHash, []).append(strFilePath)
+        return dctReturn
+
+
+    def close(self):
+        """
+        Close the manifest database.
+        """
+        self.objDb.close()
+
+
+def _pathRange(strDir):
+    '''
+    Bounds (lower inclusive, upper exclusive) of every path under a directory. SQLite compares text byte by byte (the `BINARY` collation), so unlike `LIKE` the test is case-sensitive
+    and no character of the path (`%`, `_` or the `\\` separator on Windows) needs escaping: the paths under `dir/` are exactly those from `dir/` up to `dir0` (`0` is the character after `/`).
+    '''
+    strPrefix = strDir.rstrip(os.sep) + os.sep
+    return strPrefix, strPrefix[:-1] + chr(ord(os.sep) + 1)
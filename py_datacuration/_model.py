@@ -1,4 +1,173 @@
+import functools, re
 import pydantic_core
+from pydantic import TypeAdapter
+from .DatasetModel import DatasetMetadata, File
+
+RE_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*(")?|[{}\[\]]', re.DOTALL)  # a whole string (the group is its closing quote) or a byte that changes the nesting of a JSON document
+RE_STRING_END = re.compile(rb'["\\]')  # the end of a string or an escape inside it
 
 def jsonModelValidate(jsonDatasetMetadata, allow_partial=True):
-    return pydantic_core.from_json(jsonDatasetMetadata, allow_partial=allow_partial)
\ No newline at end of file
+    return pydantic_core.from_json(jsonDatasetMetadata, allow_partial=allow_partial)
+
+
+@functools.lru_cache(maxsize=None)
+def getModelAdapter(objType):
+    '''
+    Build a validator for a type once and reuse it (building a `TypeAdapter` compiles the validator, which costs far more than using it).
+
+     Parameters
+     ----------
+     objType : type (e.g. `DatasetMetadata` or `List[File]`)
+
+     Returns
+     ----------
+     pydantic TypeAdapter
+    '''
+    return TypeAdapter(objType)
+
+
+def datasetModelValidate(vJson, blnPartial=False):
+    '''
+    Validate a raw JSON document straight into a `DatasetModel.DatasetMetadata` in one step (the JSON is parsed and validated together by pydantic_core, not parsed into dicts first).
+    With `blnPartial` a truncated document is accepted and only its complete file records are kept (a record cut anywhere, even deep inside its `variables`, is dropped).
+
+     Parameters
+     ----------
+     vJson : bytes or string (the JSON document)
+     blnPartial : boolean (accept a truncated document; defaults to False)
+
+     Returns
+     ----------
+     DatasetModel.DatasetMetadata
+
+     Example
+     ----------
+     with open(strMetadataFile, "rb") as f:
+        objMetadata = datasetModelValidate(f.read())
+    '''
+    if not blnPartial:
+        return getModelAdapter(DatasetMetadata).validate_json(vJson)
+    objStream = DatasetStreamValidator()
+    objStream.feed(vJson.encode("utf-8") if isinstance(vJson, str) else vJson)
+    return objStream._finish(blnPartial=True)
+
+
+class DatasetStreamValidator():
+    def __init__(self):
+        """
+        Validate a `DatasetMetadata` document while its bytes are still arriving (e.g. read in blocks from a large file or a download),
+        handing back each `File` record as soon as it is complete.
+
+         Example
+         ----------
+         objStream = DatasetStreamValidator()
+         with open(strMetadataFile, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                for objFile in objStream.feed(block):
+                    print(objFile.strFileName)
+         objMetadata = objStream.close()
+        """
+        self.bytBuffer = bytearray()
+        self.lstFiles = []
+        self.intPos = 0  # everything before this position has been scanned
+        self.intDepth = 0
+        self.intStringStart = None  # start of the string being scanned, if any
+        self.bytKey = None  # the last string read at the top level of the document (the key of the next value)
+        self.blnInFiles = False
+        self.intRecordStart = None
+
+
+    def feed(self, bytData):
+        """
+        Add the next block of bytes and return the `File` records completed by it. Only the new bytes are scanned, so the blocks can be of any size.
+
+         Parameters
+         ----------
+         bytData : bytes
+
+         Returns
+         ----------
+         List of DatasetModel.File
+        """
+        self.bytBuffer += bytData
+        lstNew = [File.model_validate_json(bytRecord) for bytRecord in self._scan()]
+        self.lstFiles.extend(lstNew)
+        return lstNew
+
+
+    def close(self):
+        """
+        Finish the stream (the document must now be complete) and return the whole validated document.
+
+         Returns
+         ----------
+         DatasetModel.DatasetMetadata
+        """
+        return self._finish()
+
+
+    def _finish(self, blnPartial=False):
+        """
+        Parse the whole document and return it with the `File` records already validated. With `blnPartial` a truncated document keeps only its complete file records.
+        """
+        try:
+            dctDocument = pydantic_core.from_json(bytes(self.bytBuffer))
+        except ValueError:
+            if not blnPartial:
+                raise
+            dctDocument = pydantic_core.from_json(bytes(self.bytBuffer), allow_partial=True)
+            if not isinstance(dctDocument, dict):
+                return DatasetMetadata.model_validate(dctDocument)  # raises the validation error for a malformed document
+            return DatasetMetadata(about=dctDocument.get("about"), files=self.lstFiles)
+        if isinstance(dctDocument, dict) and isinstance(dctDocument.get("files"), list) and len(dctDocument["files"]) == len(self.lstFiles):
+            return DatasetMetadata.model_validate({**dctDocument, "files": self.lstFiles})
+        return DatasetMetadata.model_validate(dctDocument)  # raises the validation error for a malformed document
+
+
+    def _scan(self):
+        """
+        Scan the bytes added since the last call and return the raw file records they complete (the objects directly inside the top-level `files` array).
+        Only strings and brackets are looked at (each string is matched in one step), and the scan stops and resumes at any byte, so every byte is scanned once.
+        """
+        lstRecords = []
+        bytBuffer = self.bytBuffer
+        while True:
+            if self.intStringStart is not None:  # a string cut off at the end of the bytes scanned so far
+                objMatch = RE_STRING_END.search(bytBuffer, self.intPos)
+                if objMatch is None:
+                    self.intPos = len(bytBuffer)
+                    return lstRecords
+                if objMatch.group() == b"\\":
+                    if objMatch.end() == len(bytBuffer):  # wait for the escaped character
+                        self.intPos = objMatch.start()
+                        return lstRecords
+                    self.intPos = objMatch.end() + 1
+                    continue
+                if self.intDepth == 1:
+                    self.bytKey = bytes(bytBuffer[self.intStringStart:objMatch.end()])
+                self.intStringStart = None
+                self.intPos = objMatch.end()
+            for objMatch in RE_TOKEN.finditer(bytBuffer, self.intPos):
+                intChar = bytBuffer[objMatch.start()]
+                if intChar == 34:  # `"`
+                    if objMatch.start(1) < 0:  # the string is not complete yet
+                        self.intStringStart = objMatch.start()
+                        self.intPos = objMatch.start() + 1
+                        break
+                    if self.intDepth == 1:
+                        self.bytKey = objMatch.group()
+                elif intChar in (123, 91):  # `{` or `[`
+                    if intChar == 91 and self.intDepth == 1 and self.bytKey is not None and pydantic_core.from_json(self.bytKey) == "files":
+                        self.blnInFiles = True
+                    elif self.blnInFiles and self.intDepth == 2 and intChar == 123:
+                        self.intRecordStart = objMatch.start()
+                    self.intDepth += 1
+                else:
+                    self.intDepth -= 1
+                    if self.blnInFiles and self.intDepth == 2 and intChar == 125:  # `}`
+                        lstRecords.append(bytes(bytBuffer[self.intRecordStart:objMatch.end()]))
+                    elif self.blnInFiles and self.intDepth == 1:
+                        self.blnInFiles = False
+            else:
+                self.intPos = len(bytBuffer)
+                return lstRecords
@@ -1,12 +1,16 @@
 '''
 This module handles MySQL database connections.
 '''
+import csv, os, tempfile
+from contextlib import contextmanager
 import pymysql
-from sqlalchemy import create_engine, update, insert, Table, Column, Numeric, Integer, String, MetaData
+import pandas as pd
+from sqlalchemy import create_engine, update, insert, inspect, text, Table, Column, Numeric, Integer, String, Text, MetaData
 from sqlalchemy.engine import result
+from ._datatable import readCsvStandardChunks
 
 class MySql():
-    def __init__(self,strMYSQL_USERNAME, strMYSQL_PASSWORD, strMYSQL_HOST, strMYSQL_DATABASE, intMYSQL_PORT):
+    def __init__(self,strMYSQL_USERNAME, strMYSQL_PASSWORD, strMYSQL_HOST, strMYSQL_DATABASE, intMYSQL_PORT, blnLocalInfile=False, intPoolSize=5, intMaxOverflow=10, intPoolRecycle=3600, blnPrePing=True):
         """
         Create the MySQL database connection strings needed to connect to the database when we are ready.
     
@@ -17,14 +21,155 @@ class MySql():
          strMYSQL_HOST : str "Hostname to connect to MySQL."
          strMYSQL_DATABASE : str "Name of database."
          intMYSQL_PORT : int "Database port number."
+         blnLocalInfile : bool "Allow `LOAD DATA LOCAL INFILE` so `bulkLoad` can use `blnLoadData=True` (the server must also allow `local_infile`)."
+         intPoolSize : int "Number of connections kept open in the pool; defaults to 5."
+         intMaxOverflow : int "Number of extra connections allowed above the pool size when it is busy; defaults to 10."
+         intPoolRecycle : int "Seconds after which a pooled connection is replaced, so we never use one the server has timed out; defaults to 3600."
+         blnPrePing : bool "Test each pooled connection before handing it out and reconnect if it is stale; defaults to True."
     
          Example
          ----------
          self.objDb = MySql("root", "someRidiculousPassword", "127.0.0.1", "sampledb", 3308)
         """
         self.blnHaveCon=False
+        self.db_connection = None
         db_connection_str = "mysql+pymysql://"+strMYSQL_USERNAME+ ":" +strMYSQL_PASSWORD +"@"+strMYSQL_HOST+"/"+ strMYSQL_DATABASE
-        self.db_engine = create_engine(db_connection_str, connect_args= dict(host=strMYSQL_HOST, port=intMYSQL_PORT))
+        self.db_engine = create_engine(db_connection_str, connect_args= dict(host=strMYSQL_HOST, port=intMYSQL_PORT, local_infile=blnLocalInfile),
+                                       pool_size=intPoolSize, max_overflow=intMaxOverflow, pool_recycle=intPoolRecycle, pool_pre_ping=blnPrePing)
+
+
+    @classmethod
+    def fromUrl(cls, strUrl, **kwargs):
+        """
+        Create the object from any SQLAlchemy database URL instead of the MySQL connection details (e.g. a local SQLite stand-in database for testing).
+
+         Parameters
+         ----------
+         strUrl : str "SQLAlchemy database URL."
+         kwargs : "Passed on to `create_engine` (e.g. `pool_size`, `max_overflow`, `pool_recycle` and `pool_pre_ping`)."
+
+         Example
+         ----------
+         objDb = MySql.fromUrl("sqlite:///test.sqlite")
+        """
+        objDb = cls.__new__(cls)
+        objDb.blnHaveCon = False
+        objDb.db_connection = None
+        objDb.db_engine = create_engine(strUrl, **kwargs)
+        return objDb
+
+
+    def bulkLoad(self, vData, strTable, intBatchSize=10000, blnCreateTable=True, blnLoadData=False):
+        """
+        Load a large amount of data into a table in batches. Each batch is written with one multi-row insert inside its own transaction,
+        so a failure only rolls back the current batch and memory stays bounded when loading a chunked CSV stream.
+
+         Parameters
+         ----------
+         vData : dataframe, iterable of dataframes or str "A dataframe, a stream of dataframe chunks (e.g. `readCsvStandardChunks`) or the path of a CSV file to stream."
+         strTable : str "Name of the table to load."
+         intBatchSize : int "Number of rows written per insert statement and transaction; defaults to 10000."
+         blnCreateTable : bool "Create the table with a text column per dataframe column if it does not exist; defaults to True."
+         blnLoadData : bool "Use MySQL `LOAD DATA LOCAL INFILE` with a temporary CSV file per batch instead of inserts (needs `blnLocalInfile=True`; missing values are loaded as empty strings)."
+
+         Returns
+         ----------
+         Number of rows loaded
+
+         Example
+         ----------
+         intRows = self.objDb.bulkLoad(strCuratedFile, "household", 50000)
+        """
+        if isinstance(vData, str):
+            vData = readCsvStandardChunks(vData, intBatchSize)
+        elif isinstance(vData, pd.DataFrame):
+            vData = [vData]
+        strInsert = None
+        intRows = 0
+        for dfChunk in vData:
+            if strInsert is None:
+                strInsert = self._getInsertSql(strTable, dfChunk.columns, blnCreateTable)
+            for intStart in range(0, len(dfChunk), intBatchSize):
+                dfBatch = dfChunk.iloc[intStart:intStart + intBatchSize]
+                with self.db_engine.begin() as objConn:  # one transaction per batch
+                    if blnLoadData:
+                        self._loadDataBatch(objConn, strTable, dfBatch)
+                    else:
+                        objConn.exec_driver_sql(strInsert, _dfRows(dfBatch))  # pymysql rewrites executemany into multi-row inserts
+                intRows += len(dfBatch)
+        return intRows
+
+
+    def queryChunks(self, strSql, dctParams=None, intChunkRows=100000, blnNormalize=True):
+        """
+        Run a query through an unbuffered server-side cursor and yield the results as dataframe chunks, so result sets of any size can be extracted with bounded memory.
+        Each chunk is normalized the same way as `readCsvStandard` (every value a string and missing values set to `.`) unless `blnNormalize` is False.
+        The format of a value never depends on the chunk it lands in: floating point columns always keep their decimal part (`4.0`, where `convert_dtypes` would write `4` for a chunk of whole numbers)
+        and date-time values are written in full (`2020-01-01 00:00:00`, with microseconds only when they are not zero).
+
+         Parameters
+         ----------
+         strSql : str "SQL query (use `:name` placeholders for parameters)."
+         dctParams : dict "Query parameters."
+         intChunkRows : int "Number of rows in each dataframe yielded; defaults to 100000."
+         blnNormalize : bool "Apply the standard string normalization; defaults to True."
+
+         Returns
+         ----------
+         generator of dataframes
+
+         Example
+         ----------
+         for dfChunk in self.objDb.queryChunks("SELECT * FROM household WHERE wave = :wave", {"wave": 3}):
+            saveToCsv(strOutFile, dfChunk)
+        """
+        with self.db_engine.connect().execution_options(stream_results=True, max_row_buffer=intChunkRows) as objConn:  # pymysql uses an SSCursor for streamed results
+            objResult = objConn.execute(text(strSql), dctParams or {})
+            lstColumns = list(objResult.keys())
+            setFloats = set()
+            for lstRows in objResult.partitions(intChunkRows):
+                df = pd.DataFrame.from_records(lstRows, columns=lstColumns)
+                if not blnNormalize:
+                    yield df
+                    continue
+                for i, strColumn in enumerate(lstColumns):
+                    if strColumn not in setFloats and df[strColumn].dtype.kind == "f" and isinstance(next((row[i] for row in lstRows if row[i] is not None), None), float):
+                        setFloats.add(strColumn)  # pandas also reads integer columns with missing values as floats, so we look at the values the driver returned
+                yield _normalizeQueryChunk(df, setFloats)
+
+
+    def _getInsertSql(self, strTable, lstColumns, blnCreateTable):
+        """
+        Build the positional insert statement for the target table, creating the table first (all text columns) if it is missing and `blnCreateTable` is set.
+        We execute the statement at the driver level since building a parameter dict per row through SQLAlchemy costs more than the insert itself.
+        """
+        if not inspect(self.db_engine).has_table(strTable):
+            if not blnCreateTable:
+                raise RuntimeError("***ERROR: table "+strTable+" does not exist***")
+            objMetadata = MetaData()
+            Table(strTable, objMetadata, *[Column(str(strColumn), Text) for strColumn in lstColumns])
+            objMetadata.create_all(self.db_engine)
+        objPreparer = self.db_engine.dialect.identifier_preparer
+        strMarker = "?" if self.db_engine.dialect.paramstyle == "qmark" else "%s"
+        return ("INSERT INTO " + objPreparer.quote(strTable) + " (" + ", ".join(objPreparer.quote(str(strColumn)) for strColumn in lstColumns) + ")"
+                " VALUES (" + ", ".join([strMarker] * len(lstColumns)) + ")")
+
+
+    def _loadDataBatch(self, objConn, strTable, dfBatch):
+        """
+        Write a batch to a temporary CSV file and load it with `LOAD DATA LOCAL INFILE`.
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8", newline="") as f:
+            dfBatch.to_csv(f, index=False, header=False, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        try:
+            strColumns = ", ".join("`" + str(strColumn).replace("`", "``") + "`" for strColumn in dfBatch.columns)
+            objConn.exec_driver_sql(
+                "LOAD DATA LOCAL INFILE %s INTO TABLE `" + strTable.replace("`", "``") + "` CHARACTER SET utf8mb4"
+                " FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY '\\n' (" + strColumns + ")",
+                (f.name,),
+            )
+        finally:
+            os.remove(f.name)
 
 
     def checkDbConn(self):
@@ -35,6 +180,7 @@ class MySql():
          ----------
          self.objDb.checkDbConn()
         """
+        self.closeDbConn()  # return any previous connection to the pool instead of leaking it
         try:
             self.db_connection = self.db_engine.connect()
             if not self.blnHaveCon:
@@ -46,11 +192,73 @@ class MySql():
         return False
 
 
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the length of a `with` block and return it to the pool afterwards.
+        Each thread should use its own connection; the pool itself is safe to share across threads.
+
+         Example
+         ----------
+         with self.objDb.connection() as objConn:
+            intRows = objConn.execute(text("SELECT COUNT(*) FROM household")).scalar()
+        """
+        with self.db_engine.connect() as objConn:
+            yield objConn
+
+
+    @contextmanager
+    def transaction(self):
+        """
+        Check a connection out of the pool and run the `with` block in a transaction that is committed at the end, or rolled back if an error is raised.
+
+         Example
+         ----------
+         with self.objDb.transaction() as objConn:
+            objConn.execute(text("DELETE FROM household WHERE wave = :wave"), {"wave": 3})
+        """
+        with self.db_engine.begin() as objConn:
+            yield objConn
+
+
+    def getPoolStatus(self):
+        """
+        Report how the connection pool is being used.
+
+         Returns
+         ----------
+         Dict with the pool size, connections checked in (idle), checked out (in use) and overflow connections
+        """
+        objPool = self.db_engine.pool
+        return {strName: getattr(objPool, strName)() for strName in ("size", "checkedin", "checkedout", "overflow") if hasattr(objPool, strName)}
+
+
+    def __enter__(self):
+        """
+        Use the object in a `with` block so the connection and pool are always cleaned up.
+
+         Example
+         ----------
+         with MySql("root", "someRidiculousPassword", "127.0.0.1", "sampledb", 3308) as objDb:
+            objDb.bulkLoad(strCuratedFile, "household")
+        """
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Close and dispose of database connection at the end of a `with` block.
+        """
+        self.endDbConn()
+
+
     def closeDbConn(self):
         """
         Close database connection. Do not call this directly.
         """
-        self.db_connection.close()
+        if self.db_connection is not None:
+            self.db_connection.close()
+            self.db_connection = None
 
     
     def disposeDb(self):
@@ -70,4 +278,25 @@ class MySql():
         """
         # https://stackoverflow.com/questions/8645250/how-to-close-sqlalchemy-connection-in-mysql
         self.closeDbConn()
-        self.disposeDb()
\ No newline at end of file
+        self.disposeDb()
+
+
+def _dfRows(df):
+    """
+    Convert a dataframe to a list of row tuples for an executemany insert, with missing values as None (NULL).
+    """
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def _normalizeQueryChunk(df, setFloats):
+    '''
+    `normalizeDfStrings` for a chunk of query results, with the float and date-time columns formatted the same way in every chunk (see `MySql.queryChunks`).
+    '''
+    dfTyped = df.convert_dtypes()
+    for strColumn in df.columns:
+        srColumn = df[strColumn]
+        if strColumn in setFloats:
+            dfTyped[strColumn] = srColumn.astype("Float64")
+        elif srColumn.dtype.kind == "M":
+            dfTyped[strColumn] = srColumn.dt.strftime("%Y-%m-%d %H:%M:%S").where(srColumn.dt.microsecond == 0, srColumn.dt.strftime("%Y-%m-%d %H:%M:%S.%f"))
+    return dfTyped.astype(pd.StringDtype()).fillna(".")
@@ -0,0 +1,190 @@
+'''
+This module contains a lazy pipeline for curating a CSV file chunk by chunk. The usual steps (read, `dropDfColumn`,
+filters, `dropDfDupRecords`, `saveToCsv`) are recorded first and only run when the output is written: dropped columns are
+never parsed (or are dropped straight after their last use), filters run on each chunk as it is read, and the rows are
+appended to the output file, so memory stays bounded whatever the size of the file.
+'''
+import os, uuid
+import pandas as pd
+from ._datatable import readCsvStandardChunks
+from ._dedup import dropDupRecordsChunks
+from ._filter import DfFilter
+
+
+class CsvPipeline():
+    def __init__(self, strFilePath, intChunkRows=100000, vSep=',', intWorkers=4, strTmpDir=None):
+        """
+        Start a pipeline reading a CSV file (normalized the same way as `readCsvStandardChunks`). Add steps with the chainable methods below; nothing is read until `saveToCsv` or `iterChunks` is called.
+
+         Parameters
+         ----------
+         strFilePath : str "Path to the CSV file; NOTE: this should be the absolute path to the file."
+         intChunkRows : int "Number of rows read at a time; defaults to 100000."
+         vSep : str "Column delimiter; defaults to `,`."
+         intWorkers : int "Number of processes used by `dropDupRecords`; defaults to 4."
+         strTmpDir : str "Directory for the `dropDupRecords` spill files; defaults to the system temporary directory."
+
+         Example
+         ----------
+         objPipeline = CsvPipeline(strRawDataFile).dropColumn("ssn").eqTo("wave", "3").dropDupRecords(["hhid"]).dropColumn("notes")
+         intRows = objPipeline.saveToCsv(strOutFile)
+        """
+        self.strFilePath = strFilePath
+        self.intChunkRows = intChunkRows
+        self.vSep = vSep
+        self.intWorkers = intWorkers
+        self.strTmpDir = strTmpDir
+        self.lstSteps = []  # ("filter", DfFilter) and ("dedup", lstColumns, strKeepRecord) in the order they were added
+        self.lstDropped = []
+
+
+    def dropColumn(self, strColumn):
+        """
+        Remove a column from the output (like `dropDfColumn`).
+        """
+        self._checkColumns([strColumn])
+        self.lstDropped.append(strColumn)
+        return self
+
+
+    def isIn(self, strColumn, lstValues):
+        """
+        Keep rows where the column value is in a list of values (like `subsetDfByList`).
+        """
+        self._checkColumns([strColumn])
+        self._filter().isIn(strColumn, lstValues)
+        return self
+
+
+    def notNa(self, strColumn):
+        """
+        Keep rows where the column value is not missing (like `filterByDfColNotNa`).
+        """
+        self._checkColumns([strColumn])
+        self._filter().notNa(strColumn)
+        return self
+
+
+    def eqTo(self, strColumn, strValue):
+        """
+        Keep rows where the column is equal to a value (like `filterByDfColEqTo`).
+        """
+        self._checkColumns([strColumn])
+        self._filter().eqTo(strColumn, strValue)
+        return self
+
+
+    def contains(self, strColumn, strValue, blnCase=True, blnRegex=True):
+        """
+        Keep rows where the column contains a value, or any of a list of terms (like `filterByDfColContains`).
+        """
+        self._checkColumns([strColumn])
+        self._filter().contains(strColumn, strValue, blnCase, blnRegex)
+        return self
+
+
+    def dropDupRecords(self, lstColumns, strKeepRecord='last'):
+        """
+        Remove duplicate records based on one or more columns over the whole file (like `dropDfDupRecords`, using the out-of-core `dropDupRecordsChunks`).
+        NOTE: filters added after this step run on the deduplicated rows, so they cannot be moved before it.
+        """
+        self._checkColumns(lstColumns)
+        self.lstSteps.append(("dedup", list(lstColumns), strKeepRecord))
+        return self
+
+
+    def iterChunks(self):
+        """
+        Run the pipeline and yield the resulting dataframes chunk by chunk.
+
+         Returns
+         ----------
+         generator of dataframes
+        """
+        lstHeader = list(pd.read_csv(self.strFilePath, quoting=1, header=0, nrows=0, sep=self.vSep).columns)
+        lstMissing = [strColumn for strColumn in self.lstDropped + self._usedColumns(self.lstSteps) if strColumn not in lstHeader]
+        if lstMissing:
+            raise RuntimeError("***ERROR: columns not found in "+self.strFilePath+": "+", ".join(dict.fromkeys(lstMissing))+"***")
+        lstFinal = [strColumn for strColumn in lstHeader if strColumn not in self.lstDropped]
+        lstParse = self._keepColumns(lstHeader, lstFinal, self.lstSteps)
+        iterChunks = readCsvStandardChunks(self.strFilePath, self.intChunkRows, vSep=self.vSep, lstColumns=None if lstParse == lstHeader else lstParse)
+        for i, tplStep in enumerate(self.lstSteps):
+            if tplStep[0] == "filter":
+                iterChunks = tplStep[1].applyChunks(iterChunks)
+            else:
+                iterChunks = dropDupRecordsChunks(iterChunks, tplStep[1], tplStep[2], intChunkRows=self.intChunkRows, intWorkers=self.intWorkers, strTmpDir=self.strTmpDir)
+            iterChunks = _projectChunks(iterChunks, self._keepColumns(lstHeader, lstFinal, self.lstSteps[i + 1:]))  # drop columns straight after their last use
+        return iterChunks
+
+
+    def saveToCsv(self, strOutPath, blnAppend=False):
+        """
+        Run the pipeline and write the result to a CSV file (written the same way as `saveToCsv`), one chunk at a time.
+
+         Parameters
+         ----------
+         strOutPath : str "Path to the CSV file to create. Without `blnAppend` it only replaces an existing file once the pipeline has finished."
+         blnAppend : bool "Append the rows to an existing file (the header is only written if the file is empty); defaults to False."
+
+         Returns
+         ----------
+         int (number of rows written)
+        """
+        strTmpPath = strOutPath if blnAppend else strOutPath + "." + uuid.uuid4().hex + ".tmp"
+        intRows = 0
+        try:
+            with open(strTmpPath, "a" if blnAppend else "w", encoding="utf-8", newline="") as f:
+                for df in self.iterChunks():
+                    df.to_csv(f, index=False, quoting=1, header=f.tell() == 0)
+                    intRows += len(df)
+            if not blnAppend:
+                os.replace(strTmpPath, strOutPath)
+        finally:
+            if not blnAppend and os.path.exists(strTmpPath):
+                os.remove(strTmpPath)
+        return intRows
+
+
+    def _filter(self):
+        """
+        The filter of the current step: consecutive filters are combined into one `DfFilter` so they share a single mask.
+        """
+        if not self.lstSteps or self.lstSteps[-1][0] != "filter":
+            self.lstSteps.append(("filter", DfFilter()))
+        return self.lstSteps[-1][1]
+
+
+    def _checkColumns(self, lstColumns):
+        """
+        Columns can only be used before they are dropped (the same error pandas would raise for the in-memory steps).
+        """
+        lstDropped = [strColumn for strColumn in lstColumns if strColumn in self.lstDropped]
+        if lstDropped:
+            raise RuntimeError("***ERROR: columns already dropped from the pipeline: "+", ".join(lstDropped)+"***")
+
+
+    def _keepColumns(self, lstHeader, lstFinal, lstSteps):
+        """
+        Columns (in file order) still needed by the output or by any of the remaining steps.
+        """
+        setKeep = set(lstFinal) | set(self._usedColumns(lstSteps))
+        return [strColumn for strColumn in lstHeader if strColumn in setKeep]
+
+
+    @staticmethod
+    def _usedColumns(lstSteps):
+        """
+        Columns read by a list of steps.
+        """
+        lstColumns = []
+        for tplStep in lstSteps:
+            lstColumns.extend(tplStep[1].getColumns() if tplStep[0] == "filter" else tplStep[1])
+        return lstColumns
+
+
+def _projectChunks(iterChunks, lstColumns):
+    '''
+    Keep only `lstColumns` in each chunk of a stream (chunks that already have exactly those columns are passed through).
+    '''
+    for df in iterChunks:
+        yield df if list(df.columns) == lstColumns else df[lstColumns]
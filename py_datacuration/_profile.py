@@ -0,0 +1,141 @@
+'''
+This module builds `DatasetModel.File` metadata records by profiling a data file. The file is streamed once in chunks and
+every per-column statistic (value counts, unique values, data type and categories) is collected in the same pass, with
+the columns split across a pool of worker threads. Cells are counted as written and only the distinct values are
+normalized at the end, so no separate type-inference pass is needed.
+'''
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from ._datatable import _normalizeCells, _readCsvChunks
+from .DatasetModel import File, Value, Variable
+
+MISSING_VALUE = "."  # the value `readCsvStandard` uses for empty cells
+
+
+def profileDataFile(strFilePath, strDirectoryLabel, strDataDescription, lstCatgories=[], intMaxCategories=20, intChunkRows=100000, intWorkers=4, vSep=','):
+    '''
+    Profile a CSV file in a single pass and return its metadata as a `DatasetModel.File` with one `Variable` per column.
+    The values are those of `readCsvStandard` (each distinct cell is normalized with the type of its whole column once the file has been read).
+    Columns with no more than `intMaxCategories` distinct values are described as categorical (each value is used as its own label until the labels are filled in).
+    Missing values (`.`) are not counted as values.
+
+     Parameters
+     ----------
+     strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
+     strDirectoryLabel : string (directory label/tag of the file in the dataset)
+     strDataDescription : string (description of the file purpose)
+     lstCatgories : list (tags or keywords for the file)
+     intMaxCategories : int (most distinct values a column can have to be treated as categorical; defaults to 20)
+     intChunkRows : int (number of rows read at a time; defaults to 100000)
+     intWorkers : int (number of threads the columns are split across; defaults to 4)
+     vSep : string (column delimiter; defaults to `,`)
+
+     Return
+     ----------
+     DatasetModel.File
+
+     Example
+     ----------
+     objFile = profileDataFile(strRawDataFile, "data", "Household survey responses", ["survey"])
+     saveJson(objFile.model_dump(exclude_none=True), strMetadataFile)
+    '''
+    dctCounts = {}
+    intRecords = 0
+    with ThreadPoolExecutor(max_workers=intWorkers) as executor:
+        for dfChunk in _readCsvChunks(strFilePath, intChunkRows, vSep=vSep, dctDtypes=str):  # cells are kept as written
+            if not dctCounts:
+                lstGroups = [list(dfChunk.columns[i::intWorkers]) for i in range(intWorkers)]
+                dctCounts = {strColumn: None for strColumn in dfChunk.columns}
+            intRecords += len(dfChunk)
+            list(executor.map(lambda lstColumns: _countColumns(dfChunk, lstColumns, dctCounts), lstGroups))  # each thread owns its own columns so no locking is needed
+        dctCounts = dict(zip(dctCounts, executor.map(_normalizeCounts, dctCounts.values())))
+    lstVariables = [_describeColumn(strColumn, srCounts, intRecords, intMaxCategories) for strColumn, srCounts in dctCounts.items()]
+    return File(
+        strFileName=os.path.basename(strFilePath),
+        recordCount=intRecords,
+        format="csv",
+        strDirectoryLabel=strDirectoryLabel,
+        strDataDescription=strDataDescription,
+        lstCatgories=lstCatgories,
+        variables=lstVariables,
+        strAnalysisNotes=_analysisNotes(dctCounts),
+    )
+
+
+def _countColumns(dfChunk, lstColumns, dctCounts):
+    '''
+    Add the value counts of a chunk to the running counts of each column.
+    '''
+    for strColumn in lstColumns:
+        srCounts = dfChunk[strColumn].value_counts(dropna=False)
+        if dctCounts[strColumn] is not None:
+            srCounts = pd.concat([dctCounts[strColumn], srCounts]).groupby(level=0, sort=False, dropna=False).sum()  # missing cells are still NaN here
+        dctCounts[strColumn] = srCounts
+
+
+def _normalizeCounts(srCounts):
+    '''
+    Turn the counts of the cells as written into counts of the normalized values (e.g. `7` and `007` are both counted as `7`).
+    '''
+    if srCounts is None:
+        return None
+    srCounts.index = pd.Index(_normalizeCells(srCounts.index), dtype="object")
+    return srCounts.groupby(level=0, sort=False).sum()
+
+
+def _describeColumn(strColumn, srCounts, intRecords, intMaxCategories):
+    '''
+    Build the `Variable` for one column from its merged value counts.
+    '''
+    srCounts = srCounts.drop(MISSING_VALUE, errors="ignore") if srCounts is not None else pd.Series(dtype="int64")
+    intUnique = len(srCounts)
+    strDataType = _inferDataType(srCounts.index)
+    blnCategorical = 0 < intUnique <= intMaxCategories
+    objValue = Value(
+        format="categorical" if blnCategorical else ("numeric" if strDataType in ("int", "float") else "text"),
+        dataType=strDataType,
+        unique=str(intUnique == intRecords),
+        category={str(v): str(v) for v in _sortValues(srCounts.index, strDataType)} if blnCategorical else None,
+    )
+    return Variable(name=strColumn, label=strColumn, value=objValue, intUniqueValues=intUnique)
+
+
+def _inferDataType(idxValues):
+    '''
+    The values are all strings after normalization, so the type is inferred from the distinct values only.
+    '''
+    if len(idxValues) == 0:
+        return "str"
+    srNumbers = pd.to_numeric(pd.Series(idxValues, dtype="object"), errors="coerce")
+    if srNumbers.isna().any():
+        return "str"
+    return "int" if (srNumbers % 1 == 0).all() and not any("." in str(v) for v in idxValues) else "float"
+
+
+def _sortValues(idxValues, strDataType):
+    '''
+    List categories in numeric order for numeric columns and alphabetically otherwise.
+    '''
+    if strDataType in ("int", "float"):
+        return sorted(idxValues, key=float)
+    return sorted(idxValues, key=str)
+
+
+def _analysisNotes(dctCounts):
+    '''
+    Note the columns that have no data or only a single value, since they can usually be ignored.
+    '''
+    lstEmpty, lstSingle = [], []
+    for strColumn, srCounts in dctCounts.items():
+        intUnique = 0 if srCounts is None else len(srCounts.drop(MISSING_VALUE, errors="ignore"))
+        if intUnique == 0:
+            lstEmpty.append(strColumn)
+        elif intUnique == 1:
+            lstSingle.append(strColumn)
+    lstNotes = []
+    if lstEmpty:
+        lstNotes.append("Fields with no data: " + ", ".join(lstEmpty))
+    if lstSingle:
+        lstNotes.append("Fields with a single value: " + ", ".join(lstSingle))
+    return "; ".join(lstNotes) or None
@@ -0,0 +1,124 @@
+'''
+This module contains a fast row counter for very large CSV files. The file is memory mapped and scanned in large blocks
+(optionally across several threads) while tracking whether each line break falls inside a quoted field, so the count
+matches the number of rows `readCsvStandard` would return. Records end with `\n`, `\r\n` or a lone `\r`, as in pandas.
+'''
+import mmap, os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCK_SIZE = 8 * 1024 * 1024  # 8 MB blocks keep the per-thread working arrays small
+
+
+def countCsvRows(strFilePath, intWorkers=1, intBlockSize=BLOCK_SIZE, strQuoteChar='"'):
+    '''
+    Count the data rows of a CSV file (assuming the first line is a header) without parsing it through pandas.
+    Line breaks inside quoted fields are not counted and blank lines are skipped, the same as `pd.read_csv` does; a line break is `\n`, `\r\n` or a lone `\r` (old Mac line endings).
+    NOTE: assumes standard CSV quoting where a quote character only appears around a field or doubled inside a quoted field
+
+     Parameters
+     ----------
+     strFilePath : string (path to the CSV file; NOTE: this should be the absolute path to the file)
+     intWorkers : int (number of threads used to scan the blocks; defaults to 1)
+     intBlockSize : int (number of bytes scanned at a time; defaults to 8 MB)
+     strQuoteChar : string (character used to quote fields; defaults to `"`)
+
+     Return
+     ----------
+     int
+
+     Example
+     ----------
+     intRows = countCsvRows(strRawDataFile, os.cpu_count())
+    '''
+    intFileSize = os.path.getsize(strFilePath)
+    if intFileSize == 0:
+        return 0
+    intQuote = ord(strQuoteChar)
+    lstRanges = [(i, min(i + intBlockSize, intFileSize)) for i in range(0, intFileSize, intBlockSize)]
+    with open(strFilePath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if intWorkers > 1 and len(lstRanges) > 1:
+            with ThreadPoolExecutor(max_workers=intWorkers) as executor:  # numpy releases the GIL while scanning so threads run in parallel
+                lstBlocks = list(executor.map(lambda r: _scanBlock(mm, r[0], r[1], intQuote), lstRanges))
+        else:
+            lstBlocks = [_scanBlock(mm, intStart, intEnd, intQuote) for intStart, intEnd in lstRanges]
+    return max(_combineBlocks(lstBlocks) - 1, 0)  # the first record is the header
+
+
+def _scanBlock(mm, intStart, intEnd, intQuote):
+    '''
+    Scan one block of bytes. Since we do not know whether the block starts inside a quoted field until the blocks before it
+    are combined, we record the result for both starting states.
+
+     Return
+     ----------
+     tuple (quote parity of the block, result when starting outside quotes, result when starting inside quotes)
+     where each result is (has a record terminator, content before the first terminator, complete non-blank records after the first terminator, content after the last terminator)
+    '''
+    arr = np.frombuffer(mm, dtype=np.uint8, count=intEnd - intStart, offset=intStart)
+    arrQuoteIdx = np.flatnonzero(arr == intQuote)
+    arrNewlineIdx = np.flatnonzero(arr == 10)
+    arrCrIdx = np.flatnonzero(arr == 13)
+    if len(arrCrIdx):  # a `\r` not followed by `\n` also ends a record (the byte after the block is read from the file)
+        arrNext = np.append(arr[1:], mm[intEnd] if intEnd < len(mm) else 0)[arrCrIdx]
+        arrNewlineIdx = np.union1d(arrNewlineIdx, arrCrIdx[arrNext != 10])
+    arrParity = np.searchsorted(arrQuoteIdx, arrNewlineIdx) & 1  # number of quotes before each line break decides if it is inside a quoted field
+    lstStates = []
+    for intState in (0, 1):
+        arrIdx = arrNewlineIdx[arrParity == intState]  # line breaks that fall outside quotes for this starting state
+        if len(arrIdx) == 0:
+            lstStates.append((False, _hasContent(mm, intStart, intEnd), 0, False))
+            continue
+        lstStates.append((
+            True,
+            _hasContent(mm, intStart, intStart + int(arrIdx[0])),
+            _countNonBlankLines(mm, arr, arrIdx, intStart),
+            _hasContent(mm, intStart + int(arrIdx[-1]) + 1, intEnd),
+        ))
+    return len(arrQuoteIdx) & 1, lstStates[0], lstStates[1]
+
+
+def _countNonBlankLines(mm, arr, arrIdx, intStart):
+    '''
+    Count the records ending at `arrIdx[1:]` that contain something other than whitespace (`pd.read_csv` skips blank lines).
+    Most records end with a non-whitespace byte (or one followed by `\r`), so only the rare remainder is checked byte by byte.
+    '''
+    arrEnd = arrIdx[1:]
+    if len(arrEnd) == 0:
+        return 0
+    arrPrev = arr[arrEnd - 1]
+    arrCr = (arrPrev == 13) & (arr[arrEnd] == 10)
+    arrPrev[arrCr] = arr[arrEnd[arrCr] - 2]  # for `\r\n` line endings look at the byte before the `\r`
+    arrBlank = (arrPrev == 10) | (arrPrev == 13) | (arrPrev == 32) | (arrPrev == 9)
+    arrCandidates = np.flatnonzero(arrBlank)
+    intBlank = sum(not _hasContent(mm, intStart + int(arrIdx[i]) + 1, intStart + int(arrIdx[i + 1])) for i in arrCandidates)
+    return len(arrEnd) - intBlank
+
+
+def _hasContent(mm, intStart, intEnd):
+    '''
+    Whether a byte range contains anything other than whitespace.
+    '''
+    return len(mm[intStart:intEnd].strip()) > 0
+
+
+def _combineBlocks(lstBlocks):
+    '''
+    Walk the block results in file order, carrying the quote state and any partial record across block boundaries.
+
+     Return
+     ----------
+     int (number of non-blank records including the header)
+    '''
+    intState = 0
+    blnPending = False  # whether the current (unterminated) record has content so far
+    intRecords = 0
+    for intParity, *lstStates in lstBlocks:
+        blnTerm, blnFirst, intRest, blnTail = lstStates[intState]
+        if blnTerm:
+            intRecords += int(blnPending or blnFirst) + intRest
+            blnPending = blnTail
+        else:
+            blnPending = blnPending or blnFirst
+        intState ^= intParity
+    return intRecords + int(blnPending)  # a last record without a trailing line break
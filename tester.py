@@ -5,16 +5,27 @@ We run the `make testVenv` command to call this script. If any packages are miss
 our requirements.txt file then we will be alerted. Any missing packages need to be added
 to the `installRequirements` make command.
 '''
+from py_datacuration._cache import *
+from py_datacuration._colindex import *
+from py_datacuration._counts import *
+from py_datacuration._curate import *
 from py_datacuration._datatable import *
+from py_datacuration._dedup import *
 from py_datacuration._display import *
 from py_datacuration._encoding import *
 from py_datacuration._export import *
 from py_datacuration._file import *
+from py_datacuration._filter import *
 from py_datacuration._json import *
+from py_datacuration._manifest import *
 from py_datacuration._model import *
 from py_datacuration._mysql_db import *
 from py_datacuration._nb import *
+from py_datacuration._pipeline import *
+from py_datacuration._profile import *
 from py_datacuration._pyth import *
+from py_datacuration._rowcount import *
 from py_datacuration.DatasetModel import *
+import ipynbname, nbconvert  # `_export` only imports these when exporting a notebook, so we check for them here
 
 print("Testing complete")
\ No newline at end of file